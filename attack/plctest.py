@@ -1,4 +1,8 @@
-import S7PLC1200
+import os
+import sys
+# import the PLC driver package from the project root folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from plcDriver import S7PLC1200
 from time import sleep
 import snap7
 from snap7.util import *
@@ -13,8 +17,7 @@ for _ in range(50):
     sleep(0.5)
     plc.writeMem('QX0.0',True) # write Q0.0 to be true, which will only turn on the output if it isn't connected to any rung in your ladder code
     sleep(0.5)
-    print(plc.getMem('QX0.0')) # read memory bit M0.1
-    print(plc.getMem('QX0.1')) # read memory bit M0.1
+    print(plc.getMany(['QX0.0', 'QX0.1'])) # read output bit Q0.0 and Q0.1 in one read
     #print(plc.getMem('MX0.1')) # read memory bit M0.1
     #print(plc.getMem('IX0.1')) # read input bit I0.0
     #print(plc.getMem("FREAL100"))# read real from MD100
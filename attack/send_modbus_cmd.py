@@ -1,5 +1,8 @@
-import socket
+import os
 import sys
+# import the PLC driver package from the project root folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from plcDriver import M2PLC221 as m221
 
 
 # function code: 
@@ -7,59 +10,16 @@ import sys
 # https://www.schneider-electric.com/en/faqs/FA295250/
 # https://www.schneider-electric.com/en/faqs/FA249614/
 
-TID = '0000'
-PROTOCOL_ID = '0000'
-UID = '01'
-BIT_COUNT = '0001'
-BYTE_COUNT = '01'
-FC = '0f' # Write Multiple Registers
-LENGTH = '0008'
-DATA_0 = '00'
-DATA_1 = '01'
-
-M0 = '0000'
-M1 = '0001'
-M2 = '0002'
-M3 = '0003'
-M4 = '0004'
-M5 = '0005'
-M6 = '0006'
-M10 = '000a'
-M20 = '0014'
-M30 = '001e'
-M40 = '0028'
-M50 = '0032'
-M60 = '003c'
-
-ADDRESS = {'M0': M0,
-           'M1': M1,
-           'M2': M2,
-           'M3': M3,
-           'M4': M4,
-           'M5': M5,
-           'M6': M6,
-           'M10': M10,
-           'M20': M20,
-           'M30': M30,
-           'M40': M40,
-           'M50': M50,
-           'M60': M60
-           }
-
-VALUES = {'0': DATA_0, '1': DATA_1}
-
 def send_write_modbus_packet(controler_ip, ref_number, data):
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.connect((controler_ip, 502))
-
-    modbus_payload = TID + PROTOCOL_ID + LENGTH + UID + FC + ref_number + BIT_COUNT + BYTE_COUNT + data
-
-    # print modbus_payload
-    s.send(modbus_payload.decode('hex'))
-    r = s.recv(1024)
-    r = r.encode('hex')
-    print(r)
-    s.close()
+    """ Write the M221 coil with one FC15 request and print the PLC response
+        result, a write to an unreachable PLC is reported as failed.
+    """
+    plc = m221.M221(controler_ip)
+    if plc.writeMany({ref_number: int(data)}):
+        print("Set %s to %s: success" % (ref_number, data))
+    else:
+        print("Set %s to %s: failed" % (ref_number, data))
+    plc.disconnect()
 
 
 #Usage: python send_modbus_cmd.py <control IP> <address> <value to set> \
@@ -78,7 +38,7 @@ else:
         print("ERROR: Control IP must be in the format x.x.x.x")
         exit()
 
-    if sys.argv[2] not in ADDRESS.keys():
+    if sys.argv[2] not in m221.MEM_ADDR.keys():
         print("ERROR: Address should be one of the following:  M0,M10,M20,M30,M40,M50,M60")
         exit()
 
@@ -87,4 +47,4 @@ else:
         exit()
 
 
-    send_write_modbus_packet(controler_ip=sys.argv[1], ref_number = ADDRESS[sys.argv[2]] ,data=VALUES[sys.argv[3]])
+    send_write_modbus_packet(controler_ip=sys.argv[1], ref_number=sys.argv[2], data=sys.argv[3])
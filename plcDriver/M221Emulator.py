@@ -0,0 +1,233 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        M221Emulator.py
+#
+# Purpose:     asyncio Modbus-TCP server emulating the Schneider M221 PLC memory
+#              for local test/benchmark without the hardware. It implements
+#              FC1/FC5/FC15 (%M coils), FC2 (%I inputs), FC3/FC16 (%MW words)
+#              over an in-memory image with the <M2PLC221.MEM_ADDR> layout, the
+#              ladder output map of the PLC in railwayGlobal.PLC_CFG is copied
+#              from the %M coils to the %Q image after every write. The %I
+#              inputs are set (and the %Q outputs read) by the test code with
+#              setInput()/runScript()/getOutputs(), such as to drive the PLC
+#              sensor input scanner <plcInputScan.py>.
+#              usage: python -m plcDriver.M221Emulator [PORT] [LATENCY_MS] [PLC_NAME]
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import asyncio
+import struct
+import sys
+import threading
+import time
+from . import M2PLC221 as m221
+
+EMU_PORT = 5020         # default port (the Modbus port 502 needs root).
+COIL_NUM = 1024         # %M bits.
+INPUT_NUM = 64          # %I bits.
+QOUT_NUM = 16           # %Q bits.
+WORD_NUM = 256          # %MW words.
+REPORT_PERIOD = 10      # counters report period (sec), 0 - no report.
+
+# Ladder output map of the M221 PLCs (railwayGlobal.PLC_CFG): {%M tag: %Q bit}
+LADDER_MAP = {
+    'PLC0': {'M10': 0, 'M0': 1, 'M60': 2},          # airport, power plant, industrial.
+    'PLC2': {'M0': 0, 'M10': 1, 'M20': 2, 'M60': 3} # turnout, track A, track B, city.
+}
+
+# Modbus exception codes.
+EX_ILLEGAL_FUNC = 0x01
+EX_ILLEGAL_ADDR = 0x02
+EX_ILLEGAL_VALUE = 0x03
+
+MBAP = struct.Struct('>HHHB')   # tid, pid, length, uid
+REQ_RANGE = struct.Struct('>HH') # start address, count / value
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221Emulator(object):
+    """ Emulated M221 PLC: the Modbus-TCP server and the memory image."""
+    def __init__(self, port=EMU_PORT, latency=0, plcName=None, host='0.0.0.0'):
+        self.host = host
+        self.port = port
+        self.latency = latency  # response delay (sec) of every request.
+        self.coils = bytearray(COIL_NUM)    # one byte per bit, 0/1.
+        self.inputs = bytearray(INPUT_NUM)
+        self.qOutputs = bytearray(QOUT_NUM)
+        self.words = [0]*WORD_NUM
+        self.ladderMap = {m221.MEM_IDX[tag]: qIdx for tag, qIdx in
+                          LADDER_MAP.get(plcName, {}).items()}
+        self.server = None
+        self.counters = {'connTotal': 0, 'connNow': 0, 'requests': 0,
+                         'exceptions': 0, 'bytesIn': 0, 'bytesOut': 0}
+        self.fcCount = {}   # requests of each function code.
+
+#--M221Emulator----------------------------------------------------------------
+    def getCounters(self):
+        """ Return a copy of the server counters."""
+        counters = dict(self.counters)
+        counters['fc'] = dict(self.fcCount)
+        return counters
+
+#--M221Emulator----------------------------------------------------------------
+    def _packBits(self, bits):
+        """ Pack the 0/1 list LSB first (Modbus bit order)."""
+        data = bytearray((len(bits) + 7)//8)
+        for idx, bit in enumerate(bits):
+            if bit: data[idx//8] |= 1 << (idx % 8)
+        return bytes(data)
+
+#--M221Emulator----------------------------------------------------------------
+    def _setCoils(self, start, bits):
+        self.coils[start:start+len(bits)] = bytes(bits)
+        for addr, qIdx in self.ladderMap.items():
+            if start <= addr < start + len(bits): self.qOutputs[qIdx] = self.coils[addr]
+
+#--M221Emulator----------------------------------------------------------------
+    def setInput(self, inTag, value):
+        """ Set the %I input, inTag: input tag such as 'I0.3' (or the index 3),
+            value: 0/1.
+        """
+        idx = inTag if isinstance(inTag, int) else int(inTag.split('.')[-1])
+        self.inputs[idx] = 1 if value else 0
+
+#--M221Emulator----------------------------------------------------------------
+    def getOutputs(self):
+        """ Return the %Q output bits set by the ladder output map: [0/1]."""
+        return list(self.qOutputs)
+
+#--M221Emulator----------------------------------------------------------------
+    def runScript(self, scriptList):
+        """ Apply the timed input changes [(time offset sec, inTag, value)] in a
+            background thread, such as toggling the sensor inputs.
+        """
+        def playback():
+            startT = time.time()
+            for (offset, inTag, value) in sorted(scriptList, key=lambda x: x[0]):
+                time.sleep(max(0, startT + offset - time.time()))
+                self.setInput(inTag, value)
+        thread = threading.Thread(target=playback)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+#--M221Emulator----------------------------------------------------------------
+    def handlePdu(self, fc, body):
+        """ Process one request PDU (without the function code), return the
+            response PDU or raise ValueError(exception code).
+        """
+        if fc in (1, 2):    # read coils / discrete inputs.
+            (start, count) = REQ_RANGE.unpack_from(body)
+            image = self.coils if fc == 1 else self.inputs
+            if not 1 <= count <= 2000: raise ValueError(EX_ILLEGAL_VALUE)
+            if start + count > len(image): raise ValueError(EX_ILLEGAL_ADDR)
+            data = self._packBits(image[start:start+count])
+            return struct.pack('>BB', fc, len(data)) + data
+        elif fc == 3:       # read holding registers.
+            (start, count) = REQ_RANGE.unpack_from(body)
+            if not 1 <= count <= 125: raise ValueError(EX_ILLEGAL_VALUE)
+            if start + count > WORD_NUM: raise ValueError(EX_ILLEGAL_ADDR)
+            return struct.pack('>BB%sH' % count, fc, count*2, *self.words[start:start+count])
+        elif fc == 5:       # write single coil.
+            (start, value) = REQ_RANGE.unpack_from(body)
+            if value not in (0x0000, 0xff00): raise ValueError(EX_ILLEGAL_VALUE)
+            if start >= COIL_NUM: raise ValueError(EX_ILLEGAL_ADDR)
+            self._setCoils(start, [1 if value else 0])
+            return struct.pack('>B', fc) + body[:4]
+        elif fc == 15:      # write multiple coils.
+            (start, count) = REQ_RANGE.unpack_from(body)
+            data = body[5:5+body[4]]
+            if not 1 <= count <= 1968 or len(data) < (count + 7)//8:
+                raise ValueError(EX_ILLEGAL_VALUE)
+            if start + count > COIL_NUM: raise ValueError(EX_ILLEGAL_ADDR)
+            self._setCoils(start, [data[i//8] >> (i % 8) & 1 for i in range(count)])
+            return struct.pack('>B', fc) + body[:4]
+        elif fc == 16:      # write multiple registers.
+            (start, count) = REQ_RANGE.unpack_from(body)
+            if not 1 <= count <= 123 or body[4] != count*2: raise ValueError(EX_ILLEGAL_VALUE)
+            if start + count > WORD_NUM: raise ValueError(EX_ILLEGAL_ADDR)
+            self.words[start:start+count] = struct.unpack_from('>%sH' % count, body, 5)
+            return struct.pack('>B', fc) + body[:4]
+        raise ValueError(EX_ILLEGAL_FUNC)
+
+#--M221Emulator----------------------------------------------------------------
+    async def handleClient(self, reader, writer):
+        """ Serve one client connection, the requests are answered in order."""
+        self.counters['connTotal'] += 1
+        self.counters['connNow'] += 1
+        try:
+            while True:
+                header = await reader.readexactly(MBAP.size)
+                (tid, pid, length, uid) = MBAP.unpack(header)
+                # length counts the unit id + PDU, the stream can not be trusted
+                # after an invalid header.
+                if pid != 0 or not 3 <= length <= m221.MAX_ADU - 6:
+                    self.counters['exceptions'] += 1
+                    break
+                pdu = await reader.readexactly(length - 1)
+                fc = pdu[0]
+                self.counters['requests'] += 1
+                self.counters['bytesIn'] += len(header) + len(pdu)
+                self.fcCount[fc] = self.fcCount.get(fc, 0) + 1
+                try:
+                    resp = self.handlePdu(fc, pdu[1:])
+                except (ValueError, struct.error) as err:
+                    code = err.args[0] if err.args and isinstance(err.args[0], int) else EX_ILLEGAL_VALUE
+                    resp = struct.pack('>BB', fc | 0x80, code)
+                    self.counters['exceptions'] += 1
+                if self.latency: await asyncio.sleep(self.latency)
+                frame = MBAP.pack(tid, pid, len(resp) + 1, uid) + resp
+                writer.write(frame)
+                self.counters['bytesOut'] += len(frame)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.counters['connNow'] -= 1
+            writer.close()
+
+#--M221Emulator----------------------------------------------------------------
+    async def start(self):
+        # big backlog so hundreds of clients can connect at the same time.
+        self.server = await asyncio.start_server(
+            self.handleClient, self.host, self.port, backlog=1024)
+        print("M221Emulator: serving on %s:%s (latency %s sec)" % (self.host, self.port, self.latency))
+
+#--M221Emulator----------------------------------------------------------------
+    async def report(self, period=REPORT_PERIOD):
+        """ Print the counters and the request rate every <period> sec."""
+        lastCount, lastT = 0, time.time()
+        while True:
+            await asyncio.sleep(period)
+            now = time.time()
+            rate = (self.counters['requests'] - lastCount)/(now - lastT)
+            lastCount, lastT = self.counters['requests'], now
+            print("M221Emulator: %.0f req/s %s" % (rate, str(self.getCounters())))
+
+#--M221Emulator----------------------------------------------------------------
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+#-----------------------------------------------------------------------------
+async def serve(port=EMU_PORT, latency=0, plcName=None):
+    """ Run the emulator until it is cancelled."""
+    emulator = M221Emulator(port=port, latency=latency, plcName=plcName)
+    await emulator.start()
+    if REPORT_PERIOD: await emulator.report()
+    else: await asyncio.Event().wait()
+
+#-----------------------------------------------------------------------------
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else EMU_PORT
+    latency = float(sys.argv[2])/1000 if len(sys.argv) > 2 else 0
+    plcName = sys.argv[3] if len(sys.argv) > 3 else None
+    try:
+        asyncio.run(serve(port, latency, plcName))
+    except KeyboardInterrupt:
+        pass
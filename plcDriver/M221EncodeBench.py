@@ -0,0 +1,73 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        M221EncodeBench.py
+#
+# Purpose:     Micro benchmark to compare the M221 Modbus frame encoding cost
+#              of the old hex string concatenation path and the precompiled
+#              struct frame template <M2PLC221.M221Encoder>. If a PLC IP is
+#              given, also measure the coil write frames per second.
+#              usage: python -m plcDriver.M221EncodeBench [PLC_IP] [PORT]
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import socket
+import sys
+import time
+import timeit
+from . import M2PLC221 as m221
+
+LOOP_NUM = 200000   # number of frames to encode.
+SEND_NUM = 2000     # number of frames to send to the PLC.
+
+#-----------------------------------------------------------------------------
+def legacyEncode(mTag, val):
+    """ The hex string path used by M221.writeMem() before the frame template."""
+    modbus_payload = m221.TID + m221.PROTOCOL_ID + m221.LENGTH + m221.UID + m221.M_FC \
+        + m221.MEM_ADDR[mTag] + m221.BIT_COUNT + m221.BYTE_COUNT + m221.VALUES[str(val)]
+    return bytes.fromhex(modbus_payload)
+
+#-----------------------------------------------------------------------------
+def benchEncode():
+    """ Compare the encode cost of one single coil FC15 frame."""
+    encoder = m221.M221Encoder()
+    assert bytes(encoder.writeCoil('M60', 1)) == legacyEncode('M60', 1)
+    result = {}
+    for name, func in (('hex string', legacyEncode), ('frame template', encoder.writeCoil)):
+        cost = timeit.timeit(lambda: func('M60', 1), number=LOOP_NUM)
+        result[name] = cost
+        print("%-16s: %8.3f us/frame, %10.0f frames/s" % (name, cost/LOOP_NUM*1e6, LOOP_NUM/cost))
+    print("Speed up: %.2fx" % (result['hex string']/result['frame template']))
+
+#-----------------------------------------------------------------------------
+def benchSend(ip, port):
+    """ Measure the coil write rate to a real/emulated PLC: the legacy hex
+        string frame with one send()/recv() per write, then the blocking and
+        pipelined M221.writeMem().
+    """
+    sock = socket.create_connection((ip, port), timeout=m221.CONN_TIMEOUT)
+    startT = time.time()
+    for i in range(SEND_NUM):
+        sock.send(legacyEncode('M10', i % 2))
+        sock.recv(1024)
+    cost = time.time() - startT
+    sock.close()
+    print("%-16s: %10.0f frames/s" % ('legacy', SEND_NUM/cost))
+    plc = m221.M221(ip, port=port)
+    for wait in (True, False):
+        startT = time.time()
+        for i in range(SEND_NUM):
+            plc.writeMem('M10', i % 2, wait=wait)
+        plc.flush()
+        cost = time.time() - startT
+        print("%-16s: %10.0f frames/s" % ('blocking' if wait else 'pipelined', SEND_NUM/cost))
+    plc.disconnect()
+
+#-----------------------------------------------------------------------------
+if __name__ == '__main__':
+    benchEncode()
+    if len(sys.argv) > 1:
+        benchSend(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else m221.PLC_PORT)
@@ -0,0 +1,274 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        M221Gateway.py
+#
+# Purpose:     Local Modbus-TCP gateway of the M221 PLCs. The M221 only accepts
+#              a few Modbus-TCP clients, so the HMIs (engineer and lecturer)
+#              and the attack tools connect to the gateway instead of the PLC.
+#              The gateway holds one upstream connection per PLC and serves
+#              many downstream clients:
+#              - reads are cached for <readTTL> sec and identical reads in
+#                flight share one upstream request (fan out to all the callers).
+#              - writes are serialized through one write queue per PLC, a queued
+#                write is replaced by a newer write to the same address range
+#                (coalesced) and the read cache is dropped after every write.
+#              - every client connection has a request quota (token bucket),
+#                the requests over the quota get the Modbus "server busy" 
+#                exception (the clients on the same host have their own quota).
+#              usage: python -m plcDriver.M221Gateway LISTEN_PORT PLC_IP[:PLC_PORT]
+#                     [LISTEN_PORT PLC_IP[:PLC_PORT] ...]
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import asyncio
+import struct
+import sys
+import time
+from collections import OrderedDict
+from . import M2PLC221 as m221
+from . import plcCache
+
+GW_PORT = 5021          # default listen port.
+READ_TTL = 0.1          # time to live of the cached read responses (sec).
+QUOTA_RATE = 200        # requests/sec of each client connection, 0 - no quota.
+QUOTA_BURST = 50        # max burst requests of each client connection.
+REPORT_PERIOD = 10      # counters report period (sec), 0 - no report.
+
+READ_FC = (1, 2, 3, 4)      # read coils/inputs/holding registers/input registers.
+SINGLE_WRITE_FC = (5, 6)    # write single coil/register.
+MULTI_WRITE_FC = (15, 16)   # write multiple coils/registers.
+
+# Modbus exception codes.
+EX_ILLEGAL_FUNC = 0x01
+EX_SERVER_BUSY = 0x06
+EX_GATEWAY_NO_RESP = 0x0B
+
+MBAP = struct.Struct('>HHHB')   # tid, pid, length, uid
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class ClientQuota(object):
+    """ Token bucket request quota of one client connection."""
+    def __init__(self, rate=QUOTA_RATE, burst=QUOTA_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.lastT = time.time()
+        self.counters = {'requests': 0, 'throttled': 0}
+
+#--ClientQuota-----------------------------------------------------------------
+    def allow(self):
+        """ Take one token, return False if the client is over the quota."""
+        self.counters['requests'] += 1
+        if not self.rate: return True
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + (now - self.lastT)*self.rate)
+        self.lastT = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.counters['throttled'] += 1
+        return False
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221Gateway(object):
+    """ Modbus-TCP gateway of one M221 PLC."""
+    def __init__(self, plcIp, plcPort=m221.PLC_PORT, port=GW_PORT, host='0.0.0.0',
+                 readTTL=READ_TTL, quotaRate=QUOTA_RATE, quotaBurst=QUOTA_BURST):
+        self.host = host
+        self.port = port
+        self.plc = m221.AsyncM221(plcIp, port=plcPort)
+        self.readCache = plcCache.PlcImageCache(ttl=readTTL)  # {(uid, fc, range): pdu}
+        self.readPending = {}   # reads in flight {(uid, fc, range): future}
+        self.writeGen = 0       # number of writes done, a read overlapped by a
+                                # write is not cached.
+        self.writeQueue = OrderedDict() # queued writes {key: [pdu, uid, [(future, pdu)]]}
+        self.writeEvent = None  # set when the write queue is not empty.
+        self.writeTask = None
+        self.quotaRate = quotaRate
+        self.quotaBurst = quotaBurst
+        self.quotaDict = {}     # {client 'ip:port': ClientQuota} of the open connections
+        self.server = None
+        self.counters = {'connTotal': 0, 'connNow': 0, 'requests': 0, 'upstream': 0,
+                         'cacheHits': 0, 'readShared': 0, 'writeCoalesced': 0,
+                         'throttled': 0, 'plcErrors': 0}
+
+#--M221Gateway-----------------------------------------------------------------
+    def getCounters(self):
+        """ Return a copy of the gateway counters and the per client quotas."""
+        counters = dict(self.counters)
+        counters['clients'] = {client: dict(quota.counters) for client, quota in self.quotaDict.items()}
+        return counters
+
+#--M221Gateway-----------------------------------------------------------------
+    async def _upstream(self, uid, pdu):
+        """ Send the request PDU to the PLC, return the response PDU or None."""
+        self.counters['upstream'] += 1
+        frame = MBAP.pack(0, 0, len(pdu) + 1, uid) + pdu
+        response = await self.plc.transact(frame)
+        if not response:
+            self.counters['plcErrors'] += 1
+            return None
+        return bytes(response[m221.MBAP_LEN:])
+
+#--M221Gateway-----------------------------------------------------------------
+    async def _read(self, uid, pdu):
+        """ Serve the read from the cache, or share the read in flight with the
+            same range, or send a new upstream read.
+        """
+        key = (uid, pdu[0], pdu[1:5])
+        resp = self.readCache.get(key)
+        if resp is not None:
+            self.counters['cacheHits'] += 1
+            return resp
+        future = self.readPending.get(key)
+        if future:
+            self.counters['readShared'] += 1
+            return await asyncio.shield(future)
+        future = self.readPending[key] = asyncio.get_event_loop().create_future()
+        (writeGen, resp) = (self.writeGen, None)
+        try:
+            resp = await self._upstream(uid, pdu)
+            if resp and not resp[0] & 0x80 and writeGen == self.writeGen:
+                self.readCache.put(key, resp)
+        finally:
+            self.readPending.pop(key, None)
+            future.set_result(resp)
+        return resp
+
+#--M221Gateway-----------------------------------------------------------------
+    async def _write(self, uid, pdu):
+        """ Queue the write and wait for the PLC response. A queued write to the
+            same address (FC5/6) or range (FC15/16, the M221 clients write the
+            coils with FC15) is replaced by this one and moved to the end of
+            the queue, so the last writer wins and the order is kept.
+        """
+        future = asyncio.get_event_loop().create_future()
+        key = (uid, pdu[0], pdu[1:3] if pdu[0] in SINGLE_WRITE_FC else pdu[1:5])
+        entry = self.writeQueue.get(key)
+        if entry:
+            self.counters['writeCoalesced'] += 1
+            entry[0] = pdu
+            entry[2].append((future, pdu))
+            self.writeQueue.move_to_end(key)
+        else:
+            self.writeQueue[key] = [pdu, uid, [(future, pdu)]]
+        self.writeEvent.set()
+        return await future
+
+#--M221Gateway-----------------------------------------------------------------
+    async def _writeLoop(self):
+        """ Send the queued writes to the PLC one by one."""
+        while True:
+            await self.writeEvent.wait()
+            while self.writeQueue:
+                (_, (pdu, uid, waitList)) = self.writeQueue.popitem(last=False)
+                resp = await self._upstream(uid, pdu)
+                self.writeGen += 1
+                self.readCache.invalidate()
+                for (future, ownPdu) in waitList:
+                    if future.done(): continue
+                    # the FC5/6 response echoes the request, so every coalesced
+                    # writer gets the echo of its own request.
+                    ok = resp and not resp[0] & 0x80 and ownPdu[0] in SINGLE_WRITE_FC
+                    future.set_result(ownPdu[:5] if ok else resp)
+            self.writeEvent.clear()
+
+#--M221Gateway-----------------------------------------------------------------
+    async def handlePdu(self, clientId, uid, pdu):
+        """ Process one client request PDU, return the response PDU."""
+        quota = self.quotaDict.get(clientId)
+        if quota is None:
+            quota = self.quotaDict[clientId] = ClientQuota(self.quotaRate, self.quotaBurst)
+        fc = pdu[0]
+        if not quota.allow():
+            self.counters['throttled'] += 1
+            return struct.pack('>BB', fc | 0x80, EX_SERVER_BUSY)
+        if fc in READ_FC:
+            resp = await self._read(uid, pdu)
+        elif fc in SINGLE_WRITE_FC or fc in MULTI_WRITE_FC:
+            resp = await self._write(uid, pdu)
+        else:
+            resp = struct.pack('>BB', fc | 0x80, EX_ILLEGAL_FUNC)
+        return resp if resp else struct.pack('>BB', fc | 0x80, EX_GATEWAY_NO_RESP)
+
+#--M221Gateway-----------------------------------------------------------------
+    async def _respond(self, writer, tid, uid, task):
+        resp = await task
+        writer.write(MBAP.pack(tid, 0, len(resp) + 1, uid) + resp)
+
+#--M221Gateway-----------------------------------------------------------------
+    async def handleClient(self, reader, writer):
+        """ Serve one client connection. The requests of one client are handled
+            concurrently (pipelined clients), the responses carry the client's
+            own transaction ID.
+        """
+        # the quota is kept per connection: the HMIs and the attack tools may
+        # run on the same host.
+        clientId = '%s:%s' % writer.get_extra_info('peername')[:2]
+        self.counters['connTotal'] += 1
+        self.counters['connNow'] += 1
+        taskList = []
+        try:
+            while True:
+                header = await reader.readexactly(MBAP.size)
+                (tid, pid, length, uid) = MBAP.unpack(header)
+                if pid != 0 or not 2 <= length <= m221.MAX_ADU - 6: break
+                pdu = await reader.readexactly(length - 1)
+                self.counters['requests'] += 1
+                task = asyncio.ensure_future(self.handlePdu(clientId, uid, pdu))
+                taskList = [t for t in taskList if not t.done()]
+                taskList.append(asyncio.ensure_future(self._respond(writer, tid, uid, task)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.counters['connNow'] -= 1
+            if taskList: await asyncio.wait(taskList)
+            self.quotaDict.pop(clientId, None)
+            writer.close()
+
+#--M221Gateway-----------------------------------------------------------------
+    async def start(self):
+        self.writeEvent = asyncio.Event()
+        self.writeTask = asyncio.ensure_future(self._writeLoop())
+        self.server = await asyncio.start_server(
+            self.handleClient, self.host, self.port, backlog=256)
+        print("M221Gateway: serving on %s:%s -> PLC %s:%s" % (
+            self.host, self.port, self.plc.ip, self.plc.port))
+
+#--M221Gateway-----------------------------------------------------------------
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.writeTask: self.writeTask.cancel()
+        await self.plc.disconnect()
+
+#-----------------------------------------------------------------------------
+async def serve(gatewayList):
+    """ Run the gateways until cancelled, gatewayList: [(listenPort, plcIp, plcPort)]"""
+    gateways = [M221Gateway(plcIp, plcPort=plcPort, port=port)
+                for (port, plcIp, plcPort) in gatewayList]
+    for gateway in gateways: await gateway.start()
+    while True:
+        await asyncio.sleep(REPORT_PERIOD or 3600)
+        if REPORT_PERIOD:
+            for gateway in gateways:
+                print("M221Gateway: %s %s" % (gateway.port, str(gateway.getCounters())))
+
+#-----------------------------------------------------------------------------
+if __name__ == '__main__':
+    gatewayList = []
+    argv = sys.argv[1:] if len(sys.argv) > 2 else [str(GW_PORT), '192.168.10.72']
+    for port, plcAddr in zip(argv[0::2], argv[1::2]):
+        (plcIp, _, plcPort) = plcAddr.partition(':')
+        gatewayList.append((int(port), plcIp, int(plcPort) if plcPort else m221.PLC_PORT))
+    try:
+        asyncio.run(serve(gatewayList))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,841 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:         M2PLC221.py
+#
+# Purpose:     This module is used to connect the Schneider M2xx PLC. The related
+#              PLC setting link(function code):
+#              https://www.schneider-electric.com/en/faqs/FA308725/
+#              https://www.schneider-electric.com/en/faqs/FA295250/
+#              https://www.schneider-electric.com/en/faqs/FA249614/
+#
+# Author:      Yuancheng Liu
+#
+# Created:     2019/09/02
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import asyncio
+import socket
+import select
+import struct
+import threading
+import time
+from . import plcBreaker
+from . import plcCache
+
+PLC_PORT = 502
+# M221 PLC memory address list.
+MEM_ADDR = {'M0':   '0000',
+            'M1':   '0001',
+            'M2':   '0002',
+            'M3':   '0003',
+            'M4':   '0004',
+            'M5':   '0005',
+            'M6':   '0006',
+            'M10':  '000a',
+            'M20':  '0014',
+            'M30':  '001e',
+            'M40':  '0028',
+            'M50':  '0032',
+            'M60':  '003c'
+           }
+MEM_IDX = {tag: int(addr, 16) for tag, addr in MEM_ADDR.items()}  # tag -> bit address.
+MEM_BITS = 0x3d     # number of %M bits covering all the tags (M0 - M60).
+INPUT_BITS = 8      # number of %I bits wired to the sensors (%I0.0 - %I0.7).
+
+TID = '0000'    # placeholder, set to the real transaction ID by M221Conn.submit()
+PROTOCOL_ID = '0000'
+UID = '01'
+BIT_COUNT = '0001'
+BYTE_COUNT = '01'
+LENGTH = '0008'
+M_FC = '0f' # memory access function code.
+M_RD = '01' # read internal bits %M
+M_RI = '02' # read discrete inputs %I
+
+VALUES = {'0': '00', '1': '01'}
+
+# Binary frame layout: MBAP header(tid, pid, length, uid) + function code + ...
+FRAME_BITS = struct.Struct('>HHHBBHH')      # read bits: + start address, bit count
+FRAME_WRITE = struct.Struct('>HHHBBHHB')    # FC15: + start address, bit count, byte count
+
+CONN_TIMEOUT = 2        # socket connect timeout (sec).
+CALL_TIMEOUT = 1        # default deadline of one request/response (sec).
+IDLE_CHECK = 5          # check the connection health if idle more than 5 sec.
+MAX_INFLIGHT = 8        # max number of pipelined requests waiting for response.
+MBAP_LEN = 7            # Modbus-TCP MBAP header length.
+MAX_ADU = 260           # max Modbus-TCP frame size.
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221Request(object):
+    """ One Modbus transaction sent to the PLC, the response is matched back
+        by the MBAP transaction ID.
+    """
+    def __init__(self, plcConn, tid):
+        self.plcConn = plcConn
+        self.tid = tid
+        self.response = None    # response frame (memoryview of the receive buffer
+                                # until it is handed to the caller).
+        self.done = False       # flag to identify the transaction finished.
+
+#--M221Request-----------------------------------------------------------------
+    def result(self, timeout=None):
+        """ Wait for the response and return the response frame as bytes (None
+            if the connection was lost or the deadline passed before the 
+            response arrived). timeout: deadline in sec, default 
+            <M221Conn.callTimeout>. The frame is copied out of the receive ring
+            under the connection lock, so the caller can parse it after the 
+            lock is released while other threads keep using the connection.
+        """
+        with self.plcConn.lock:
+            if not self.done: self.plcConn.waitFor(self, timeout=timeout)
+            if isinstance(self.response, memoryview):
+                self.response = bytes(self.response)
+            return self.response
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221FrameReader(object):
+    """ Receive the Modbus-TCP frames based on the MBAP length field into a 
+        preallocated ring of frame slots. The frame is kept in the request as a
+        memoryview of its slot (no copy on receive). Before a slot is reused 
+        the view of a request not yet collected is swapped to a bytes copy, and
+        M221Request.result() gives the caller a bytes copy, so the caller never
+        holds a view into the ring.
+    """
+    def __init__(self, slotNum=MAX_INFLIGHT*2):
+        self.slotNum = slotNum
+        self.buf = bytearray(MAX_ADU * slotNum)
+        self.view = memoryview(self.buf)
+        self.slotIdx = 0
+        self.slotOwners = [None] * slotNum  # request using the frame in each slot.
+
+#--M221FrameReader-------------------------------------------------------------
+    def readFrame(self, sock):
+        """ Read one whole frame from the socket and return (tid, frameView)."""
+        idx = self.slotIdx
+        self.slotIdx = (idx + 1) % self.slotNum
+        owner = self.slotOwners[idx]
+        if owner is not None and isinstance(owner.response, memoryview):
+            owner.response = bytes(owner.response)
+        self.slotOwners[idx] = None
+        offset = idx * MAX_ADU
+        self._recvInto(sock, self.view[offset:offset+MBAP_LEN])
+        tid, pid, length = struct.unpack_from('>HHH', self.buf, offset)
+        # length counts the unit id + PDU, a valid PDU is 2 ~ 253 bytes.
+        if pid != 0 or not 3 <= length <= MAX_ADU - 6:
+            raise OSError("invalid MBAP header %s" % self.view[offset:offset+MBAP_LEN].hex())
+        frameEnd = offset + 6 + length
+        self._recvInto(sock, self.view[offset+MBAP_LEN:frameEnd])
+        return tid, self.view[offset:frameEnd]
+
+#--M221FrameReader-------------------------------------------------------------
+    def setOwner(self, request):
+        """ Register the request which got the last read frame."""
+        self.slotOwners[(self.slotIdx - 1) % self.slotNum] = request
+
+#--M221FrameReader-------------------------------------------------------------
+    def _recvInto(self, sock, view):
+        """ Fill the memory view with the bytes from the socket."""
+        while len(view):
+            nbytes = sock.recv_into(view)
+            if not nbytes: raise OSError("connection closed by PLC")
+            view = view[nbytes:]
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221Conn(object):
+    """ Long-lived Modbus-TCP socket to one M221 PLC. The socket is shared by
+        all the M221 clients of the same IP address. Requests are sent with
+        increasing transaction IDs so several of them can be in flight at the
+        same time, the responses are dispatched to the callers by the TID.
+        Every call has a deadline and the circuit breaker makes the calls fail
+        fast while the PLC is down.
+    """
+    def __init__(self, ip, port=PLC_PORT, maxInflight=MAX_INFLIGHT, callTimeout=CALL_TIMEOUT):
+        self.ip = ip
+        self.port = port
+        self.sock = None
+        self.lock = threading.RLock()
+        self.refCount = 0       # number of M221 clients using this connection.
+        self.lastUsed = 0       # time stamp of the last transaction.
+        self.tidCount = 0       # MBAP transaction ID of the last request.
+        self.maxInflight = maxInflight
+        self.pendingDict = {}   # pending requests {tid: M221Request}
+        self.reader = M221FrameReader(slotNum=maxInflight*2)
+        self.callTimeout = callTimeout
+        self.breaker = plcBreaker.CircuitBreaker('M221 %s' % ip, trialTimeout=callTimeout)
+        self.cache = plcCache.PlcImageCache()  # bit images {(start, count): M221BitImage}
+
+#--M221Conn--------------------------------------------------------------------
+    def connect(self, timeout=CONN_TIMEOUT):
+        """ (Re)connect to the PLC, return True if connected."""
+        self.close()
+        try:
+            sock = socket.create_connection((self.ip, self.port), timeout=timeout)
+            sock.settimeout(self.callTimeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            self.sock = sock
+            self.lastUsed = time.time()
+            return True
+        except OSError as err:
+            print("M221Conn:    PLC %s connection fail: %s" % (self.ip, str(err)))
+            self.breaker.onFailure()
+            return False
+
+#--M221Conn--------------------------------------------------------------------
+    def isAlive(self):
+        """ Check whether the socket is still usable. A readable socket without
+            any pending request means the PLC closed the link (or sent stale
+            data), either way the socket can not be reused.
+        """
+        if self.sock is None: return False
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            if readable and not self.sock.recv(1, socket.MSG_PEEK):
+                return False
+            return not readable
+        except (OSError, ValueError):
+            return False
+
+#--M221Conn--------------------------------------------------------------------
+    def submit(self, bdata, deadline=None):
+        """ Send the Modbus frame with a new transaction ID without waiting for
+            the response. Return the M221Request to get the response later.
+            deadline: time stamp bounding the reconnect (default CONN_TIMEOUT).
+        """
+        with self.lock:
+            self._drain()
+            self.tidCount = (self.tidCount + 1) & 0xFFFF
+            request = M221Request(self, self.tidCount)
+            # Fail fast if the PLC is down or can not be reconnected.
+            if not self.breaker.allow():
+                request.done = True
+                return request
+            if not self.pendingDict and (self.sock is None or (
+                    time.time() - self.lastUsed > IDLE_CHECK and not self.isAlive())):
+                connTimeout = min(CONN_TIMEOUT, deadline - time.time()) if deadline else CONN_TIMEOUT
+                if connTimeout <= 0:
+                    self.breaker.onFailure()    # end the trial call allowed above.
+                    request.done = True
+                    return request
+                if not self.connect(timeout=connTimeout):
+                    request.done = True
+                    return request
+            # Too many requests in flight: wait for the oldest one.
+            while len(self.pendingDict) >= self.maxInflight:
+                self.waitFor(next(iter(self.pendingDict.values())))
+            frame = bdata if isinstance(bdata, bytearray) else bytearray(bdata)
+            struct.pack_into('>H', frame, 0, request.tid)
+            try:
+                self.sock.sendall(frame)
+                self.pendingDict[request.tid] = request
+            except (OSError, AttributeError) as err:
+                print("M221Conn:    PLC %s send error: %s" % (self.ip, str(err)))
+                request.done = True
+                self._reset()
+            return request
+
+#--M221Conn--------------------------------------------------------------------
+    def transact(self, bdata, timeout=None):
+        """ Send the Modbus frame and return the response bytes. Reconnect and
+            retry one time if the long-lived socket was dropped by the PLC.
+            Both attempts (and the reconnect) share one deadline of <timeout>
+            sec (default <callTimeout>).
+        """
+        deadline = time.time() + (timeout or self.callTimeout)
+        with self.lock:
+            for _ in range(2):
+                if deadline - time.time() <= 0: break
+                request = self.submit(bdata, deadline=deadline)
+                timeLeft = deadline - time.time()
+                if timeLeft <= 0 and not request.done: break
+                response = request.result(timeout=max(timeLeft, 0.001))
+                if response: return response
+            return None
+
+#--M221Conn--------------------------------------------------------------------
+    def waitFor(self, request, timeout=None):
+        """ Read the responses from the socket until the request is answered or
+            the deadline passed, the responses of other pending requests are 
+            dispatched on the way.
+        """
+        deadline = time.time() + (timeout or self.callTimeout)
+        with self.lock:
+            while not request.done:
+                if not self._readResponse(deadline - time.time()):
+                    break
+
+#--M221Conn--------------------------------------------------------------------
+    def flush(self, timeout=None):
+        """ Wait until all the pending requests are answered."""
+        deadline = time.time() + (timeout or self.callTimeout)
+        with self.lock:
+            while self.pendingDict:
+                if not self._readResponse(deadline - time.time()):
+                    break
+
+#--M221Conn--------------------------------------------------------------------
+    def _drain(self):
+        """ Dispatch the responses already arrived without blocking."""
+        while self.pendingDict and self.sock:
+            try:
+                readable, _, _ = select.select([self.sock], [], [], 0)
+            except (OSError, ValueError):
+                readable = None
+            if not readable or not self._readResponse(self.callTimeout):
+                break
+
+#--M221Conn--------------------------------------------------------------------
+    def _readResponse(self, timeout):
+        """ Read one response frame and hand it to the pending request with the
+            same transaction ID. Return False if the connection is lost or no
+            response in <timeout> sec (the stream can not be trusted after a 
+            partial frame, so the socket is reset in both case).
+        """
+        try:
+            if timeout <= 0: raise socket.timeout("deadline passed")
+            self.sock.settimeout(timeout)
+            tid, frame = self.reader.readFrame(self.sock)
+            self.sock.settimeout(self.callTimeout)
+        except (OSError, AttributeError) as err:
+            print("M221Conn:    PLC %s receive error: %s" % (self.ip, str(err)))
+            self._reset()
+            return False
+        self.lastUsed = time.time()
+        self.breaker.onSuccess()
+        request = self.pendingDict.pop(tid, None)
+        if request:
+            request.response, request.done = frame, True
+            self.reader.setOwner(request)
+        return True
+
+#--M221Conn--------------------------------------------------------------------
+    def _reset(self):
+        """ Drop the broken socket and fail all the pending requests, the next
+            request will reconnect.
+        """
+        for request in self.pendingDict.values():
+            request.done = True
+        self.pendingDict = {}
+        self.close()
+        self.breaker.onFailure()
+        self.cache.invalidate()
+
+#--M221Conn--------------------------------------------------------------------
+    def close(self):
+        """ Close the socket."""
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221ConnPool(object):
+    """ Connection pool keyed by the PLC IP address. The M221 only accepts a few
+        Modbus-TCP clients and is slow to accept new ones, so the pool keeps
+        one long-lived connection per PLC and hands it out to every user.
+    """
+    def __init__(self):
+        self.connDict = {}
+        self.lock = threading.Lock()
+
+#--M221ConnPool----------------------------------------------------------------
+    def getConn(self, ip, port=PLC_PORT):
+        """ Get the connection to the PLC, connect if the connection is not
+            created or not healthy.
+        """
+        with self.lock:
+            conn = self.connDict.get((ip, port))
+            if conn is None:
+                conn = self.connDict[(ip, port)] = M221Conn(ip, port=port)
+            conn.refCount += 1
+        with conn.lock:
+            if not (conn.pendingDict or conn.breaker.blocked() or conn.isAlive()):
+                conn.connect()
+        return conn
+
+#--M221ConnPool----------------------------------------------------------------
+    def releaseConn(self, conn):
+        """ Give back the connection, the socket is kept open for next user."""
+        with self.lock:
+            conn.refCount = max(0, conn.refCount - 1)
+
+#--M221ConnPool----------------------------------------------------------------
+    def closeAll(self):
+        """ Close all the sockets in the pool."""
+        with self.lock:
+            for conn in self.connDict.values():
+                with conn.lock:
+                    conn.flush()
+                    conn.close()
+            self.connDict = {}
+
+# Pool shared by all the M221 clients in the process.
+gConnPool = M221ConnPool()
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221Encoder(object):
+    """ Precompiled Modbus frame templates of one PLC. The fixed header is
+        built one time, encoding a request only patches the address and value
+        bytes in place (the transaction ID is patched by M221Conn.submit()).
+    """
+    def __init__(self, uid=int(UID, 16)):
+        self.uid = uid
+        self.addrDict = MEM_IDX
+        # FC15 single coil write: header + addr(8) + count(10) + byte count(12) + value(13)
+        self.coilFrame = bytearray(FRAME_WRITE.size + 1)
+        FRAME_WRITE.pack_into(self.coilFrame, 0, 0, 0, 8, uid, int(M_FC, 16), 0, 1, 1)
+        # FC1 read bits: header + start(8) + count(10)
+        self.readFrame = bytearray(FRAME_BITS.size)
+        FRAME_BITS.pack_into(self.readFrame, 0, 0, 0, 6, uid, int(M_RD, 16), 0, 0)
+        # FC2 read inputs: header + start(8) + count(10)
+        self.inputFrame = bytearray(FRAME_BITS.size)
+        FRAME_BITS.pack_into(self.inputFrame, 0, 0, 0, 6, uid, int(M_RI, 16), 0, 0)
+
+#--M221Encoder-----------------------------------------------------------------
+    def writeCoil(self, mTag, val):
+        """ Return the FC15 frame to set one memory bit."""
+        frame = self.coilFrame
+        struct.pack_into('>H', frame, 8, self.addrDict[mTag])
+        frame[13] = 1 if val else 0
+        return frame
+
+#--M221Encoder-----------------------------------------------------------------
+    def readBits(self, start, count):
+        """ Return the FC1 frame to read <count> bits from <start> address."""
+        struct.pack_into('>HH', self.readFrame, 8, start, count)
+        return self.readFrame
+
+#--M221Encoder-----------------------------------------------------------------
+    def readInputs(self, start, count):
+        """ Return the FC2 frame to read <count> %I inputs from <start> address."""
+        struct.pack_into('>HH', self.inputFrame, 8, start, count)
+        return self.inputFrame
+
+#--M221Encoder-----------------------------------------------------------------
+    def writeMany(self, tagDict):
+        """ Return the FC15 frames for the tagDict, one frame for each group of
+            contiguous memory addresses.
+        """
+        addrList = sorted((self.addrDict[tag], val) for tag, val in tagDict.items())
+        groups = []
+        for addr, val in addrList:
+            if groups and addr == groups[-1][0] + len(groups[-1][1]):
+                groups[-1][1].append(val)
+            else:
+                groups.append((addr, [val]))
+        frameList = []
+        for addr, valList in groups:
+            bitVal = sum((1 << i) for i, val in enumerate(valList) if val)
+            byteCount = (len(valList) + 7)//8
+            frame = bytearray(FRAME_WRITE.size + byteCount)
+            FRAME_WRITE.pack_into(frame, 0, 0, 0, 7 + byteCount, self.uid, int(M_FC, 16),
+                                  addr, len(valList), byteCount)
+            frame[FRAME_WRITE.size:] = bitVal.to_bytes(byteCount, 'little')
+            frameList.append(frame)
+        return frameList
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221BitImage(object):
+    """ Packed image of the bits read from the PLC, bit N of the value is the 
+        memory address <start>+N. Tags are decoded by a shift and mask.
+    """
+    def __init__(self, start, count, value):
+        self.start = start
+        self.count = count
+        self.value = value  # (int) packed bits.
+
+#--M221BitImage----------------------------------------------------------------
+    def getBit(self, addr):
+        """ Return the bit(0/1) of the memory address."""
+        return (self.value >> (addr - self.start)) & 1
+
+#--M221BitImage----------------------------------------------------------------
+    def getTag(self, mTag):
+        """ Return the bit(0/1) of the memory tag in <MEM_ADDR>."""
+        return (self.value >> (MEM_IDX[mTag] - self.start)) & 1
+
+    __getitem__ = getTag
+
+#--M221BitImage----------------------------------------------------------------
+    def setBit(self, addr, val):
+        """ Return a new image with the bit of the memory address changed."""
+        mask = 1 << (addr - self.start)
+        value = self.value | mask if val else self.value & ~mask
+        return M221BitImage(self.start, self.count, value)
+
+#--M221BitImage----------------------------------------------------------------
+    def anyBits(self, addr, count):
+        """ Return True if any of the <count> bits from the address is set."""
+        return bool((self.value >> (addr - self.start)) & ((1 << count) - 1))
+
+#--M221BitImage----------------------------------------------------------------
+    def toBytes(self):
+        """ Return the image as Modbus packed bytes (LSB first)."""
+        return self.value.to_bytes((self.count + 7)//8, 'little')
+
+#-----------------------------------------------------------------------------
+def parseBitImage(start, count, response):
+    """ Decode the FC1/FC2 response frame to a M221BitImage, return None if the
+        response is missing or a Modbus exception.
+    """
+    if not response or response[MBAP_LEN] & 0x80: return None
+    byteCount = response[MBAP_LEN+1]
+    value = int.from_bytes(response[MBAP_LEN+2:MBAP_LEN+2+byteCount], 'little')
+    return M221BitImage(start, count, value & ((1 << count) - 1))
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221(object):
+    def __init__(self, ip, debug=False, port=PLC_PORT, pool=None, queueWrites=True,
+                 cacheTTL=None):
+        self.ip = ip
+        self.debug = debug      # print the request/response frames.
+        self.pool = pool if pool else gConnPool
+        self.plcConn = self.pool.getConn(self.ip, port=port)
+        self.encoder = M221Encoder()
+        # Writes while the PLC is down are queued (last value of each tag) and
+        # sent after the PLC recovered, or dropped if queueWrites is False.
+        self.queueWrites = queueWrites
+        self.queuedDict = {}
+        # The bit images read from the PLC are cached <cacheTTL> sec (shared by
+        # all the clients of the PLC).
+        if cacheTTL is not None: self.plcConn.cache.ttl = cacheTTL
+
+#-----------------------------------------------------------------------------
+    def _cacheWrites(self, tagDict, done=True):
+        """ Patch the cached bit images with the written tags if the write is 
+            done, else drop the images covering the tags.
+        """
+        addrList = [(MEM_IDX[tag], val) for tag, val in tagDict.items()]
+        if not done:
+            self.plcConn.cache.invalidate(
+                lambda key: any(key[0] <= addr < key[0] + key[1] for addr, _ in addrList))
+            return
+        def patch(key, image):
+            for addr, val in addrList:
+                if key[0] <= addr < key[0] + key[1]: image = image.setBit(addr, val)
+            return image
+        self.plcConn.cache.update(patch)
+
+#-----------------------------------------------------------------------------
+    def isConnected(self):
+        """ Return the PLC connection state from the circuit breaker: 1/0."""
+        return self.plcConn.breaker.isConnected()
+
+#-----------------------------------------------------------------------------
+    def _holdWrites(self, tagDict):
+        """ Queue/drop the writes if the PLC is down and return True, else send
+            the queued writes first and return False.
+        """
+        if self.plcConn.breaker.blocked():
+            if self.queueWrites: self.queuedDict.update(tagDict)
+            return True
+        for tag in tagDict: self.queuedDict.pop(tag, None)  # overwritten by the new write.
+        self.sendQueued()
+        return False
+
+#-----------------------------------------------------------------------------
+    def sendQueued(self):
+        """ Send the writes queued while the PLC was down if the breaker lets
+            the calls through (call it periodically to replay them as soon as
+            the PLC recovered). Return True if no write is left queued.
+        """
+        if not self.queuedDict: return True
+        if self.plcConn.breaker.blocked(): return False
+        queuedDict, self.queuedDict = self.queuedDict, {}
+        # a failed writeMany() queues the tags again.
+        return self.writeMany(queuedDict) or not self.queuedDict
+
+#-----------------------------------------------------------------------------
+    def writeMem(self, mTag, val, wait=True):
+        """ Set the plc memory address. mTag: (str)memory tag, val:(int) 0/1
+            wait: wait for the PLC response, if set to False the request is
+            pipelined and the M221Request is returned (use flush() or 
+            M221Request.result() to collect the response). Return None if
+            the PLC is down (the write is queued or dropped).
+        """
+        if self._holdWrites({mTag: val}): return None
+        with self.plcConn.lock:
+            bdata = self.encoder.writeCoil(mTag, val)
+            if self.debug: print(bdata.hex())
+            if not wait:
+                self._cacheWrites({mTag: val}, done=False)
+                return self.plcConn.submit(bdata)
+            response = self.plcConn.transact(bdata)
+        if self.debug: print(response.hex() if response else '')
+        if response and not response[MBAP_LEN] & 0x80:
+            self._cacheWrites({mTag: val})
+        elif not response and self.queueWrites:
+            self.queuedDict[mTag] = val
+
+#-----------------------------------------------------------------------------
+    def writeMany(self, tagDict, wait=True):
+        """ Set several plc memory addresses. tagDict: {(str)memory tag: (int) 0/1}
+            Adjacent addresses are grouped into one multi-coil FC15 frame, the
+            non-adjacent groups are sent as pipelined frames. Return True if
+            all the frames are accepted by the PLC (list of M221Request if wait
+            is set to False).
+        """
+        if self._holdWrites(tagDict): return [] if not wait else False
+        requests = [self.plcConn.submit(bdata) for bdata in self.encoder.writeMany(tagDict)]
+        if not wait:
+            self._cacheWrites(tagDict, done=False)
+            return requests
+        result, lost = True, False
+        for request in requests:
+            response = request.result()
+            if self.debug: print(response.hex() if response else '')
+            # Modbus exception response has the function code's high bit set.
+            if not response or response[MBAP_LEN] & 0x80: result = False
+            if not response: lost = True
+        self._cacheWrites(tagDict, done=result)
+        # the coil writes are idempotent: queue all the tags if a frame got no
+        # response, the new values written in the mean time are kept.
+        if lost and self.queueWrites:
+            self.queuedDict = dict(tagDict, **self.queuedDict)
+        return result
+
+#-----------------------------------------------------------------------------
+    def readBits(self, start=0, count=MEM_BITS):
+        """ Read <count> %M bits from the <start> address with one FC1 request,
+            return the M221BitImage (None if the read failed). The image is 
+            served from the cache if it was read within the cache TTL.
+        """
+        image = self.plcConn.cache.get((start, count))
+        if image: return image
+        with self.plcConn.lock:
+            response = self.plcConn.transact(self.encoder.readBits(start, count))
+        image = parseBitImage(start, count, response)
+        if image: 
+            self.plcConn.cache.put((start, count), image)
+        else:
+            self.plcConn.cache.invalidate()
+        return image
+
+#-----------------------------------------------------------------------------
+    def readInputs(self, start=0, count=INPUT_BITS):
+        """ Read <count> %I inputs from the <start> address with one FC2 request,
+            return the M221BitImage (None if the read failed). The inputs are
+            changed by the field devices, so they are never cached.
+        """
+        with self.plcConn.lock:
+            response = self.plcConn.transact(self.encoder.readInputs(start, count))
+        return parseBitImage(start, count, response)
+
+#-----------------------------------------------------------------------------
+    def redMem(self, wait=True):
+        """ Read the plc internal bits %M0 - %M60, return the response hex string.
+            (return the M221Request if wait is set to False.)
+        """
+        with self.plcConn.lock:
+            bdata = self.encoder.readBits(0, MEM_BITS)
+            if self.debug: print(bdata.hex())
+            if not wait: return self.plcConn.submit(bdata)
+            response = self.plcConn.transact(bdata)
+        response = response.hex() if response else ''
+        if self.debug: print(response)
+        return str(response)
+
+#-----------------------------------------------------------------------------
+    def flush(self):
+        """ Wait for the responses of all the pipelined requests."""
+        self.plcConn.flush()
+
+#-----------------------------------------------------------------------------
+    def disconnect(self):
+        """ Release the PLC connection back to the pool, the socket is kept
+            alive for the other clients.
+        """
+        if self.debug: print("M221:    Disconnect from PLC.")
+        self.plcConn.flush()
+        self.pool.releaseConn(self.plcConn)
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class AsyncM221(object):
+    """ asyncio version of the M221 client with the same writeMem()/redMem()
+        semantics. Requests are pipelined on the stream with their own TID and
+        a reader task dispatches the responses, so one event loop can drive 
+        many PLCs at the same time:
+            plcs = [AsyncM221(ip) for ip in ipList]
+            await asyncio.gather(*[plc.writeMem('M10', 1) for plc in plcs])
+        Every call has a deadline and the circuit breaker makes the calls fail
+        fast while the PLC is down, same as <M221Conn>.
+    """
+    def __init__(self, ip, debug=False, port=PLC_PORT, maxInflight=MAX_INFLIGHT,
+                 callTimeout=CALL_TIMEOUT):
+        self.ip = ip
+        self.port = port
+        self.debug = debug
+        self.callTimeout = callTimeout
+        self.breaker = plcBreaker.CircuitBreaker('AsyncM221 %s' % ip, trialTimeout=callTimeout)
+        self.encoder = M221Encoder()
+        self.reader = self.writer = None
+        self.readTask = None
+        self.tidCount = 0
+        self.pendingDict = {}   # pending requests {tid: asyncio.Future}
+        self.maxInflight = maxInflight
+        # asyncio lock objects are created in the running loop by connect().
+        self.inflight = self.connLock = None
+
+#--AsyncM221-------------------------------------------------------------------
+    async def connect(self):
+        """ Connect to the PLC if not connected, return True if connected."""
+        if self.connLock is None:
+            self.connLock = asyncio.Lock()
+            self.inflight = asyncio.Semaphore(self.maxInflight)
+        async with self.connLock:
+            if self.writer: return True
+            try:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.ip, self.port), CONN_TIMEOUT)
+            except (OSError, asyncio.TimeoutError) as err:
+                print("AsyncM221:   PLC %s connection fail: %s" % (self.ip, str(err)))
+                self.breaker.onFailure()
+                return False
+            self.readTask = asyncio.ensure_future(self._readLoop(self.reader))
+            return True
+
+#--AsyncM221-------------------------------------------------------------------
+    async def _readLoop(self, reader):
+        """ Read the response frames and resolve the pending futures by TID."""
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_LEN)
+                tid, pid, length = struct.unpack('>HHH', header[:6])
+                if pid != 0 or not 3 <= length <= MAX_ADU - 6:
+                    raise OSError("invalid MBAP header %s" % header.hex())
+                frame = header + await reader.readexactly(length - 1)
+                self.breaker.onSuccess()
+                future = self.pendingDict.pop(tid, None)
+                if future and not future.done(): future.set_result(frame)
+        except (OSError, asyncio.IncompleteReadError) as err:
+            print("AsyncM221:   PLC %s receive error: %s" % (self.ip, str(err)))
+            self.breaker.onFailure()
+        finally:
+            # the stream may be already reset (and reconnected) by a timeout.
+            if reader is self.reader: self._reset()
+
+#--AsyncM221-------------------------------------------------------------------
+    def _reset(self):
+        """ Drop the stream and fail all the pending requests."""
+        for future in self.pendingDict.values():
+            if not future.done(): future.set_result(None)
+        self.pendingDict = {}
+        if self.readTask and self.readTask is not asyncio.current_task():
+            self.readTask.cancel()
+        self.readTask = None
+        if self.writer: self.writer.close()
+        self.reader = self.writer = None
+
+#--AsyncM221-------------------------------------------------------------------
+    async def _request(self, frame):
+        """ Send the frame with a new transaction ID and wait for the response,
+            return None if the connection failed, the deadline passed or the 
+            breaker is open (PLC down).
+        """
+        if not self.breaker.allow(): return None
+        if not await self.connect(): return None
+        async with self.inflight:
+            self.tidCount = tid = (self.tidCount + 1) & 0xFFFF
+            struct.pack_into('>H', frame, 0, tid)
+            future = self.pendingDict[tid] = asyncio.get_event_loop().create_future()
+            if self.debug: print(frame.hex())
+            try:
+                self.writer.write(frame)    # the transport copies the frame.
+                await self.writer.drain()
+            except (OSError, AttributeError) as err:
+                print("AsyncM221:   PLC %s send error: %s" % (self.ip, str(err)))
+                self.breaker.onFailure()
+                self._reset()
+            try:
+                response = await asyncio.wait_for(future, self.callTimeout)
+            except asyncio.TimeoutError:
+                # a PLC not answering: the stream can not be trusted any more.
+                print("AsyncM221:   PLC %s response timeout." % self.ip)
+                self.breaker.onFailure()
+                self.pendingDict.pop(tid, None)
+                self._reset()
+                response = None
+            if self.debug: print(response.hex() if response else '')
+            return response
+
+#--AsyncM221-------------------------------------------------------------------
+    def isConnected(self):
+        """ Return the PLC connection state from the circuit breaker: 1/0."""
+        return self.breaker.isConnected()
+
+#--AsyncM221-------------------------------------------------------------------
+    async def transact(self, frame):
+        """ Send the raw Modbus-TCP frame (any function code), return the response
+            frame or None. Used by the <M221Gateway> to forward client requests.
+        """
+        return await self._request(bytearray(frame))
+
+#--AsyncM221-------------------------------------------------------------------
+    async def writeMem(self, mTag, val):
+        """ Set the plc memory address. mTag: (str)memory tag, val:(int) 0/1"""
+        return await self._request(bytearray(self.encoder.writeCoil(mTag, val)))
+
+#--AsyncM221-------------------------------------------------------------------
+    async def writeMany(self, tagDict):
+        """ Set several plc memory addresses with the batched FC15 frames, return
+            True if all the frames are accepted by the PLC.
+        """
+        responses = await asyncio.gather(
+            *[self._request(frame) for frame in self.encoder.writeMany(tagDict)])
+        return all(response and not response[MBAP_LEN] & 0x80 for response in responses)
+
+#--AsyncM221-------------------------------------------------------------------
+    async def readBits(self, start=0, count=MEM_BITS):
+        """ Read <count> %M bits from the <start> address, return M221BitImage."""
+        response = await self._request(bytearray(self.encoder.readBits(start, count)))
+        return parseBitImage(start, count, response)
+
+#--AsyncM221-------------------------------------------------------------------
+    async def redMem(self):
+        """ Read the plc internal bits %M0 - %M60, return the response hex string."""
+        response = await self._request(bytearray(self.encoder.readBits(0, MEM_BITS)))
+        return response.hex() if response else ''
+
+#--AsyncM221-------------------------------------------------------------------
+    async def disconnect(self):
+        """ Disconnect from PLC."""
+        if self.readTask: self.readTask.cancel()
+        self._reset()
+
+#-----------------------------------------------------------------------------
+def testCase():
+    plc = M221('192.168.10.72')
+    plc.writeMem('M10', 0)
+    # Pipelined toggle: all the frames are sent before the first response.
+    for val in (1, 0, 1, 0):
+        plc.writeMem('M10', val, wait=False)
+    plc.flush()
+    plc.disconnect()
+    gConnPool.closeAll()
+
+#-----------------------------------------------------------------------------
+async def asyncTestCase(ipList=('192.168.10.72', '192.168.10.71')):
+    """ Read all the M221 PLCs at the same time."""
+    plcList = [AsyncM221(ip) for ip in ipList]
+    startT = time.time()
+    images = await asyncio.gather(*[plc.readBits() for plc in plcList])
+    print("Read %s PLCs in %.3f sec" % (len(plcList), time.time() - startT))
+    for plc, image in zip(plcList, images):
+        print("%s: %s" % (plc.ip, hex(image.value) if image else 'read fail'))
+        await plc.disconnect()
+
+#-----------------------------------------------------------------------------
+if __name__ == '__main__':
+    testCase()
+    #asyncio.run(asyncTestCase())
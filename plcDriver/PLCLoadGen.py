@@ -0,0 +1,169 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        PLCLoadGen.py
+#
+# Purpose:     Load generator and benchmark harness of the PLC clients: drive N
+#              simulated clients (threads) against the emulated or real PLCs
+#              with a configurable read/write mix, batch size and open/closed
+#              loop mode, then report the p50/p95/p99 RTT, ops/s, frames/s and
+#              error rate as JSON.
+#              usage: python -m plcDriver.PLCLoadGen -t M -i 127.0.0.1 -p 5020 -n 8
+#              (run "python -m plcDriver.PLCLoadGen -h" for all the options)
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import argparse
+import contextlib
+import json
+import random
+import sys
+import threading
+import time
+from . import M2PLC221 as m221
+from .plcInterface import getDriver
+
+# Bit addresses used by the load of each PLC type.
+ADDR_DICT = {
+    'M': list(m221.MEM_ADDR.keys()),
+    'C': ['qx0.%s' % str(i) for i in range(8)]
+}
+
+#-----------------------------------------------------------------------------
+def percentile(sortedList, pct):
+    """ Return the <pct> percentile of the sorted value list (nearest rank)."""
+    if not sortedList: return None
+    idx = min(len(sortedList) - 1, max(0, int(round(pct/100.0*len(sortedList))) - 1))
+    return sortedList[idx]
+
+def roundMs(value):
+    return None if value is None else round(value, 3)
+
+#-----------------------------------------------------------------------------
+def frameCount(driver, plcType, op, addrList):
+    """ Number of request frames of one operation: one FC1 frame (M221) / one
+        read per area (S7) for the reads, one FC15 frame per contiguous tags
+        (M221) / one write_area per byte (S7) for the writes.
+    """
+    if op == 'r': return 1
+    if plcType == 'M':
+        return len(driver.plc.encoder.writeMany({addr: 0 for addr in addrList}))
+    return len(set(addr.split('.')[0] for addr in addrList))
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class LoadClient(threading.Thread):
+    """ One simulated PLC client running the operations until <endT>. In the
+        closed loop the next operation starts when the previous one finished,
+        in the open loop the operations are scheduled at <rate> per sec and the
+        RTT is counted from the scheduled time (the queueing delay included).
+    """
+    def __init__(self, args, driver, endT):
+        threading.Thread.__init__(self)
+        self.args = args
+        self.driver = driver
+        self.endT = endT
+        self.addrList = ADDR_DICT[args.type]
+        # RTT (ms) of each operation type, 'e': the operations raised an exception.
+        self.rttDict = {'r': [], 'w': [], 'e': []}
+        self.errCount = 0
+        self.frameCount = 0
+
+#--LoadClient------------------------------------------------------------------
+    def runOp(self):
+        """ Run one read/write operation, return (op, result)."""
+        addrList = random.sample(self.addrList, min(self.args.batch, len(self.addrList)))
+        op = 'w' if random.random() < self.args.write else 'r'
+        self.frameCount += frameCount(self.driver, self.args.type, op, addrList)
+        if op == 'r':
+            return (op, self.driver.read_bits(addrList) is not None)
+        return (op, bool(self.driver.write_bits({addr: random.randint(0, 1) for addr in addrList})))
+
+#--LoadClient------------------------------------------------------------------
+    def run(self):
+        interval = 1.0/self.args.rate if self.args.rate else 0
+        nextT = time.time()
+        while nextT < self.endT:
+            if interval:
+                time.sleep(max(0, nextT - time.time()))
+                startT = nextT      # open loop: count the RTT from the schedule.
+                nextT += interval
+            else:
+                startT = time.time()
+            try:
+                (op, result) = self.runOp()
+            except Exception:
+                (op, result) = ('e', False)
+            if not result: self.errCount += 1
+            self.rttDict[op].append((time.time() - startT)*1000)
+            if not interval: nextT = time.time()
+
+#-----------------------------------------------------------------------------
+def runLoad(args):
+    """ Run the load and return the result dict."""
+    driverList = []
+    for _ in range(args.clients):
+        kwargs = {'port': args.port} if args.port else {}
+        # every M221 client gets its own connection unless shared is set.
+        if args.type == 'M' and not args.shared: kwargs['pool'] = m221.M221ConnPool()
+        driverList.append(getDriver(args.type, args.ip, **kwargs))
+    startT = time.time()
+    clientList = [LoadClient(args, driver, startT + args.duration) for driver in driverList]
+    for client in clientList: client.start()
+    for client in clientList: client.join()
+    duration = time.time() - startT
+    for driver in driverList: driver.close()
+    # Collect the results.
+    result = {'plcType': args.type, 'ip': args.ip, 'clients': args.clients,
+              'mode': 'open' if args.rate else 'closed', 'writeRatio': args.write,
+              'batch': args.batch, 'duration': round(duration, 3)}
+    opsNum = 0
+    # every operation counts in the ops/s and the error rate, the exceptions
+    # are reported in their own bucket.
+    for op, name in (('r', 'read'), ('w', 'write'), ('e', 'exception')):
+        rttList = sorted(rtt for client in clientList for rtt in client.rttDict[op])
+        opsNum += len(rttList)
+        result[name] = {'ops': len(rttList),
+                        'p50_ms': roundMs(percentile(rttList, 50)),
+                        'p95_ms': roundMs(percentile(rttList, 95)),
+                        'p99_ms': roundMs(percentile(rttList, 99)),
+                        'max_ms': roundMs(rttList[-1] if rttList else None)}
+    errNum = sum(client.errCount for client in clientList)
+    frameNum = sum(client.frameCount for client in clientList)
+    result['ops_per_s'] = round(opsNum/duration, 1)
+    result['frames_per_s'] = round(frameNum/duration, 1)
+    result['error_rate'] = round(errNum/float(max(1, opsNum)), 4)
+    return result
+
+#-----------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description='PLC client load generator.')
+    parser.add_argument('-t', '--type', default='M', choices=['M', 'C'],
+                        help='PLC type: M - M221, C - S7-1200')
+    parser.add_argument('-i', '--ip', default='127.0.0.1', help='PLC IP address')
+    parser.add_argument('-p', '--port', type=int, default=0, help='PLC port (0 - default port)')
+    parser.add_argument('-n', '--clients', type=int, default=1, help='number of clients')
+    parser.add_argument('-d', '--duration', type=float, default=10, help='test time (sec)')
+    parser.add_argument('-w', '--write', type=float, default=0.5, help='write ratio 0-1')
+    parser.add_argument('-b', '--batch', type=int, default=1, help='bits per operation')
+    parser.add_argument('-r', '--rate', type=float, default=0,
+                        help='open loop ops/s of each client (0 - closed loop)')
+    parser.add_argument('-s', '--shared', action='store_true',
+                        help='M221 clients share one pooled connection')
+    parser.add_argument('-o', '--out', default=None, help='JSON result file')
+    args = parser.parse_args()
+    # stdout only carries the JSON result, the client diagnostics (connection
+    # errors, breaker state) go to stderr.
+    with contextlib.redirect_stdout(sys.stderr):
+        result = runLoad(args)
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, 'w') as fh:
+            json.dump(result, fh, indent=2)
+
+#-----------------------------------------------------------------------------
+if __name__ == '__main__':
+    main()
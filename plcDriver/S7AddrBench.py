@@ -0,0 +1,55 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        S7AddrBench.py
+#
+# Purpose:     Micro benchmark to compare the S7-1200 memory address handling
+#              cost of parsing the address string on every call and the 
+#              memoized address descriptor <S7PLC1200.compileMem>. If a PLC IP
+#              is given, also measure the getMem() calls per second.
+#              usage: python -m plcDriver.S7AddrBench [PLC_IP] [PORT]
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import sys
+import time
+import timeit
+from . import S7PLC1200 as s71200
+
+LOOP_NUM = 200000   # number of address to compile.
+READ_NUM = 1000     # number of getMem() calls to the PLC.
+ADDR_LIST = ['qx0.3', 'MX0.1', 'IX0.0', 'MW20', 'MB24', 'MD100']
+
+#-----------------------------------------------------------------------------
+def benchCompile():
+    """ Compare the cost of parsing the address string every call (the 
+        unwrapped compileMem) and the memoized descriptor.
+    """
+    result = {}
+    for name, func in (('parse per call', s71200.compileMem.__wrapped__), 
+                       ('memoized', s71200.compileMem)):
+        cost = timeit.timeit(lambda: [func(mem) for mem in ADDR_LIST], number=LOOP_NUM)
+        callNum = LOOP_NUM*len(ADDR_LIST)
+        result[name] = cost
+        print("%-16s: %8.3f us/call, %10.0f calls/s" % (name, cost/callNum*1e6, callNum/cost))
+    print("Speed up: %.2fx" % (result['parse per call']/result['memoized']))
+
+#-----------------------------------------------------------------------------
+def benchRead(ip, port):
+    """ Measure the getMem() rate of a real/emulated PLC."""
+    plc = s71200.S7PLC1200(ip, port=port)
+    startT = time.time()
+    for i in range(READ_NUM):
+        plc.getMem('qx0.%s' % str(i % 8))
+    cost = time.time() - startT
+    print("%-16s: %10.0f calls/s" % ('getMem', READ_NUM/cost))
+    plc.plc.disconnect()
+
+#-----------------------------------------------------------------------------
+if __name__ == '__main__':
+    benchCompile()
+    if len(sys.argv) > 1:
+        benchRead(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else s71200.S7_PORT)
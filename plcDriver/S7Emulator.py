@@ -0,0 +1,169 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        S7Emulator.py
+#
+# Purpose:     Local stand-in of the Siemens S7-1200 PLC (PLC1 192.168.10.73)
+#              built on the snap7 server, so the <S7PLC1200> client can be
+#              tested/benchmarked on any Linux box without the hardware. It
+#              registers the I, Q, M and DB areas used by the railway hub
+#              (Qx0.0 - Qx0.4) and pwrGen (qx0.3/qx0.4 motor bits) and is
+#              scriptable: preloaded values, timed value changes, injected
+#              response latency and scan-time jitter.
+#              usage: python -m plcDriver.S7Emulator [PORT] [LATENCY_MS] [JITTER_MS]
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import ctypes
+import random
+import sys
+import threading
+import time
+import snap7
+from snap7.util import *
+try:
+    from snap7.type import SrvArea  # python-snap7 >= 2.0 takes the area enum.
+except ImportError:
+    SrvArea = int
+from . import S7PLC1200 as s71200
+
+EMU_PORT = 1102         # default port (the S7 port 102 needs root).
+AREA_SIZE = 256         # bytes of each I/Q/M area.
+DB_SIZE = 1024          # bytes of each data block.
+DB_LIST = (1,)          # data block numbers registered.
+
+# snap7 server area codes.
+SRV_AREA_PE = 0         # process inputs (I).
+SRV_AREA_PA = 1         # process outputs (Q).
+SRV_AREA_MK = 2         # merkers (M).
+SRV_AREA_DB = 5         # data blocks.
+SRV_AREA = {'i': SRV_AREA_PE, 'q': SRV_AREA_PA, 'm': SRV_AREA_MK}
+
+# snap7 server event codes of the data read/write.
+EVC_DATA_READ = 0x00020000
+EVC_DATA_WRITE = 0x00040000
+
+# PLC1 outputs at power on: all the hub/pwrGen output bits off.
+PRELOAD_DICT = {'qx0.0': 0, 'qx0.1': 0, 'qx0.2': 0, 'qx0.3': 0, 'qx0.4': 0}
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class S7Emulator(object):
+    """ Emulated S7-1200 PLC: every data read/write request is delayed by
+        <latency> + random(0, <jitter>) sec to emulate the PLC scan cycle.
+    """
+    def __init__(self, port=EMU_PORT, latency=0, jitter=0, preloadDict=PRELOAD_DICT):
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.server = snap7.server.Server()
+        self.imageDict = {}     # live image of each area {'i'/'q'/'m'/dbNum: buffer}
+        for memType, areaCode in SRV_AREA.items():
+            self.imageDict[memType] = self._registerArea(areaCode, 0, AREA_SIZE)
+        for dbNum in DB_LIST:
+            self.imageDict[dbNum] = self._registerArea(SRV_AREA_DB, dbNum, DB_SIZE)
+        self.counters = {'reads': 0, 'writes': 0}
+        self.server.set_events_callback(self._onEvent)
+        for mem, value in preloadDict.items(): self.setValue(mem, value)
+
+#--S7Emulator------------------------------------------------------------------
+    def _registerArea(self, areaCode, index, size):
+        """ Register the area to the server, return the live memory buffer."""
+        buf = (ctypes.c_ubyte * size)()
+        # the pure python snap7 server (python-snap7 >= 2.0) keeps its own
+        # bytearray copy of the area, use that one as the live image.
+        areaDict = getattr(self.server, 'memory_areas', None)
+        keyList = list(areaDict.keys()) if areaDict is not None else []
+        self.server.register_area(SrvArea(areaCode), index, buf)
+        if areaDict is not None:
+            newKeys = [key for key in areaDict.keys() if key not in keyList]
+            if newKeys: return areaDict[newKeys[0]]
+        return buf
+
+#--S7Emulator------------------------------------------------------------------
+    def _onEvent(self, event):
+        """ Server event callback, called in the server worker thread before the
+            response is sent, so sleeping here delays the response.
+        """
+        if event.EvtCode == EVC_DATA_READ:
+            self.counters['reads'] += 1
+        elif event.EvtCode == EVC_DATA_WRITE:
+            self.counters['writes'] += 1
+        else:
+            return
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay: time.sleep(delay)
+
+#--S7Emulator------------------------------------------------------------------
+    def setValue(self, mem, value):
+        """ Set the value of the memory address (such as 'ix0.1', 'MW20')."""
+        (area, start, length, out, bit) = s71200.compileMem(mem)
+        memType = mem[0].lower()
+        buf = self.imageDict[memType]
+        data = bytearray(buf[start:start+length])
+        if out == s71200.OUT_BOOL:
+            set_bool(data, 0, bit, bool(value))
+        elif out == s71200.OUT_INT:
+            data = bytearray(value.to_bytes(length, 'big', signed=True))
+        elif out == s71200.OUT_DWORD:
+            set_dword(data, 0, value)
+        elif out == s71200.OUT_REAL:
+            set_real(data, 0, value)
+        buf[start:start+length] = data
+
+#--S7Emulator------------------------------------------------------------------
+    def getValue(self, mem):
+        """ Get the value of the memory address."""
+        (area, start, length, out, bit) = s71200.compileMem(mem)
+        data = bytearray(self.imageDict[mem[0].lower()][start:start+length])
+        if out == s71200.OUT_BOOL:
+            return get_bool(data, 0, bit)
+        elif out == s71200.OUT_INT:
+            return int.from_bytes(data, 'big', signed=True)
+        elif out == s71200.OUT_DWORD:
+            return get_dword(data, 0)
+        elif out == s71200.OUT_REAL:
+            return get_real(data, 0)
+
+#--S7Emulator------------------------------------------------------------------
+    def runScript(self, scriptList):
+        """ Apply the timed value changes [(time offset sec, mem, value)] in a
+            background thread, such as toggling the sensor inputs.
+        """
+        def playback():
+            startT = time.time()
+            for (offset, mem, value) in sorted(scriptList, key=lambda x: x[0]):
+                time.sleep(max(0, startT + offset - time.time()))
+                self.setValue(mem, value)
+        thread = threading.Thread(target=playback)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+#--S7Emulator------------------------------------------------------------------
+    def start(self):
+        self.server.start(self.port)
+        print("S7Emulator: serving on port %s (latency %s sec, jitter %s sec)" % (
+            self.port, self.latency, self.jitter))
+
+#--S7Emulator------------------------------------------------------------------
+    def stop(self):
+        self.server.stop()
+        self.server.destroy()
+
+#-----------------------------------------------------------------------------
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else EMU_PORT
+    latency = float(sys.argv[2])/1000 if len(sys.argv) > 2 else 0
+    jitter = float(sys.argv[3])/1000 if len(sys.argv) > 3 else 0
+    emulator = S7Emulator(port=port, latency=latency, jitter=jitter)
+    emulator.start()
+    try:
+        while True:
+            time.sleep(10)
+            print("S7Emulator: %s" % str(emulator.counters))
+    except KeyboardInterrupt:
+        emulator.stop()
@@ -0,0 +1,635 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:           S7PLC1200.py
+#
+# Purpose:        This module is used to connect the siemens s7-1200 PLC. This
+#                moduel was improved based on the project:
+#                http://simplyautomationized.blogspot.com/2014/12/raspberry-pi-getting-data-from-s7-1200.html
+#
+# Author:      Yuancheng Liu
+#
+# Created:     2019/08/02
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from time import sleep
+import threading
+import time
+import snap7
+from snap7.util import *
+import struct
+from . import plcBreaker
+from . import plcCache
+from . import plcScan
+try:
+    import numpy as np  # optional, only needed by the bulk decoding getBlock().
+except ImportError:
+    np = None
+
+# Set the output type
+OUT_BOOL = 1
+OUT_INT = 2
+OUT_REAL = 3
+OUT_WORD = 4
+OUT_DWORD = 5
+
+S7_PORT = 102           # ISO-on-TCP port of the S7 PLC.
+
+# snap7 client parameter number and the timeout value (ms). The pure python 
+# client of python-snap7 >= 3.0 only stores the parameters: its call timeout is
+# set on the connection by connect(), its connect timeout is fixed to 5 sec.
+S7_PING_TIMEOUT = 3     # connection (ping) timeout.
+S7_SEND_TIMEOUT = 4
+S7_RECV_TIMEOUT = 5
+CONN_TIMEOUT = 2000
+CALL_TIMEOUT = 1000
+
+SHADOW_SIZE = 8         # bytes of each area (from byte 0) kept in the shadow image.
+SHADOW_AGE = 0          # max age (sec) of the shadow bytes used by a bit write.
+MERGE_GAP = 4           # getMany() merges the reads with a gap <= MERGE_GAP bytes.
+ADDR_CACHE_SIZE = 256   # max number of the compiled address descriptors kept.
+SCAN_PERIOD = 0.5       # S7ScanEngine scan period (sec).
+INPUT_BITS = 8          # number of I bits wired to the sensors (Ix0.0 - Ix0.7).
+MAX_QUEUE = 16          # max pending calls of one S7Executor worker.
+
+# S7 PDU size: the read/write payload of one request is the negotiated PDU 
+# size minus the protocol headers.
+PDU_DEFAULT = 240       # min PDU size of the S7 protocol, used before connected.
+READ_OVERHEAD = 18      # header + param + data item header of the read response.
+WRITE_OVERHEAD = 35     # header + param + data item header of the write request.
+
+MEM_AREA = {'m': 0x83, 'q': 0x82, 'i': 0x81}
+AREA_DB = 0x84          # data block area.
+
+# Big-endian NumPy dtype of the S7 data types decoded by getBlock().
+BLOCK_DTYPE = {
+    'real'  : '>f4',
+    'dword' : '>u4',
+    'dint'  : '>i4',
+    'word'  : '>u2',
+    'int'   : '>i2',
+    'byte'  : 'u1'
+}
+
+# Compiled (immutable) memory address descriptor.
+S7Addr = namedtuple('S7Addr', ['area', 'start', 'length', 'out', 'bit'])
+
+#-----------------------------------------------------------------------------
+@lru_cache(maxsize=ADDR_CACHE_SIZE)
+def compileMem(mem):
+    """ Compile the memory address string (such as 'qx0.3', 'MW20', 'MD100') 
+        to a S7Addr descriptor, the result is memoized so the string is only 
+        parsed once.
+    """
+    out = None  # output functino selection type
+    start = 0  # start position idx
+    bit = 0
+    length = 1  # data length
+    # get the area memory address
+    memType = mem[0].lower()
+    area = MEM_AREA[memType]
+    # Set the data lenght and start idx.
+    if(mem[1].lower() == 'x'):  # bit
+        length, out, start, bit = 1, OUT_BOOL, int(
+            mem.split('.')[0][2:]), int(mem.split('.')[1])
+    elif(mem[1].lower() == 'b'):  # byte
+        length, out, start = 1, OUT_INT, int(mem[2:])
+    elif(mem[1].lower() == 'w'):  # word
+        length, out, start = 2, OUT_INT, int(mem[2:])
+    elif(mem[1].lower() == 'd'):  # double
+        length, out, start = 4, OUT_DWORD, int(mem.split('.')[0][2:])
+    elif('freal' in mem.lower()):  # double word (real numbers)
+        length, out, start = 4, OUT_REAL, int(mem.lower().replace('freal', ''))
+    return S7Addr(area, start, length, out, bit)
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class S7PLC1200(object):
+    def __init__(self, ip, debug=False, queueWrites=True, cacheTTL=plcCache.CACHE_TTL,
+                 port=S7_PORT, shadowAge=SHADOW_AGE):
+        self.ip = ip
+        self.port = port
+        self.debug = debug
+        self.plc = snap7.client.Client()
+        self.memAreaDict = MEM_AREA
+        self.breaker = plcBreaker.CircuitBreaker('S7-1200 %s' % ip, 
+                                                 trialTimeout=CALL_TIMEOUT/1000.0)
+        self.lock = threading.RLock()   # the snap7 client is shared by threads.
+        # Writes while the PLC is down are queued (last value of each address)
+        # and sent after the PLC recovered, or dropped if queueWrites is False.
+        self.queueWrites = queueWrites
+        self.queuedDict = {}
+        # Bytes read from the PLC are cached <cacheTTL> sec: {(area, start, length): bytearray}
+        self.cache = plcCache.PlcImageCache(ttl=cacheTTL)
+        # Shadow process image of the Q/M/I areas {area: bytearray(SHADOW_SIZE)}, 
+        # kept in sync by the reads and our own writes. The other clients and
+        # the ladder logic change the bits too, so a bit write only takes its 
+        # byte from the shadow if the whole area was read within <shadowAge> 
+        # sec (by a S7ScanEngine), else the byte is read from the PLC first.
+        self.shadowDict = {area: bytearray(SHADOW_SIZE) for area in self.memAreaDict.values()}
+        self.shadowTime = {area: 0 for area in self.memAreaDict.values()}
+        self.shadowAge = shadowAge
+        self.pduSize = PDU_DEFAULT  # negotiated PDU size, updated when connected.
+        try:
+            self.plc.set_param(S7_PING_TIMEOUT, CONN_TIMEOUT)
+            self.plc.set_param(S7_SEND_TIMEOUT, CALL_TIMEOUT)
+            self.plc.set_param(S7_RECV_TIMEOUT, CALL_TIMEOUT)
+        except Exception as err:
+            print("S7PLC1200:   Set timeout parameters error: %s" % str(err))
+        self.connect()
+
+#-----------------------------------------------------------------------------
+    def connect(self):
+        """ (Re)connect to the PLC, return True if connected."""
+        try:
+            self.plc.disconnect()
+            if self.port == S7_PORT:
+                self.plc.connect(self.ip, 0, 1)  # connect to the PLC
+            else:
+                self.plc.connect(self.ip, 0, 1, self.port)  # PLC emulator port.
+            self._setCallTimeout()
+            self._expireShadow()
+            try:
+                self.pduSize = self.plc.get_pdu_length()
+            except Exception as err:
+                print("S7PLC1200:   Get PDU size error: %s" % str(err))
+                self.pduSize = PDU_DEFAULT
+            return True
+        except Exception as err:
+            print("S7PLC1200:   PLC %s connection fail: %s" % (self.ip, str(err)))
+            self.breaker.onFailure()
+            return False
+
+#-----------------------------------------------------------------------------
+    def _setCallTimeout(self):
+        """ Apply the CALL_TIMEOUT to the connection of the python-snap7 >= 3.0
+            client, which ignores the set_param() timeouts (the C library 
+            based clients have no such connection attribute).
+        """
+        conn = getattr(self.plc, 'connection', None)
+        if conn is None or not hasattr(conn, 'timeout'): return
+        conn.timeout = CALL_TIMEOUT/1000.0
+        if getattr(conn, 'socket', None): conn.socket.settimeout(conn.timeout)
+
+#-----------------------------------------------------------------------------
+    def isConnected(self):
+        """ Return the PLC connection state from the circuit breaker: 1/0."""
+        return self.breaker.isConnected()
+
+#-----------------------------------------------------------------------------
+    def _call(self, func, *args):
+        """ Call the snap7 client function guarded by the circuit breaker, 
+            return None if the PLC is down or the call failed.
+        """
+        if not self.breaker.allow(): return None
+        with self.lock:
+            if not self.plc.get_connected() and not self.connect(): return None
+            try:
+                result = func(*args)
+                self.breaker.onSuccess()
+                return result
+            except Exception as err:
+                print("S7PLC1200:   PLC %s call error: %s" % (self.ip, str(err)))
+                self.breaker.onFailure()
+                self.cache.invalidate()
+                self._expireShadow()
+                self.plc.disconnect()   # reconnect at the next allowed call.
+                return None
+
+#-----------------------------------------------------------------------------
+    def _readArea(self, area, dbNum, start, size):
+        """ Read <size> bytes of the area, a transfer bigger than the PDU payload
+            is split to chunks read back to back into one buffer. Return the 
+            bytearray (None if any chunk failed).
+        """
+        chunk = self.pduSize - READ_OVERHEAD
+        if size <= chunk: return self._call(self.plc.read_area, area, dbNum, start, size)
+        mbyte = bytearray(size)
+        with self.lock:
+            for offset in range(0, size, chunk):
+                data = self._call(self.plc.read_area, area, dbNum, start+offset, 
+                                  min(chunk, size-offset))
+                if data is None: return None
+                mbyte[offset:offset+len(data)] = data
+        return mbyte
+
+#-----------------------------------------------------------------------------
+    def _readShadowed(self, area, dbNum, start, size):
+        """ Read the bytes and copy them in the shadow image under the same lock,
+            so a write between the read and the shadow patch can not be undone
+            by the older bytes. Return the bytearray (None if failed).
+        """
+        with self.lock:
+            mbyte = self._readArea(area, dbNum, start, size)
+            if mbyte is not None and area != AREA_DB: 
+                self._patchShadow(area, start, mbyte)
+                if start == 0 and size >= SHADOW_SIZE: self.shadowTime[area] = time.time()
+            return mbyte
+
+#-----------------------------------------------------------------------------
+    def _currentBytes(self, area, start, length):
+        """ Return the current bytes of the address for a read-modify-write: the
+            shadow bytes if they are not older than <shadowAge> sec, else the 
+            bytes read from the PLC (None if failed). Call under the client lock.
+        """
+        if self.shadowAge > 0 and start + length <= SHADOW_SIZE and \
+                time.time() - self.shadowTime[area] < self.shadowAge:
+            return self.shadowDict[area][start:start+length]
+        return self._readShadowed(area, 0, start, length)
+
+#-----------------------------------------------------------------------------
+    def _writeArea(self, area, dbNum, start, data):
+        """ Write the data to the area, a transfer bigger than the PDU payload is
+            split to chunks (memoryview slices, no copy) written back to back.
+            Return None if any chunk failed.
+        """
+        chunk = self.pduSize - WRITE_OVERHEAD
+        if len(data) <= chunk: return self._call(self.plc.write_area, area, dbNum, start, data)
+        view = memoryview(data)
+        result = None
+        with self.lock:
+            for offset in range(0, len(data), chunk):
+                result = self._call(self.plc.write_area, area, dbNum, start+offset, 
+                                    view[offset:offset+chunk])
+                if result is None: return None
+        return result
+
+#-----------------------------------------------------------------------------
+    def _decode(self, mbyte, offset, out, bit):
+        """ Decode the value at the <offset> of the bytes with the utility 
+            functions from <snap7.util>.
+        """
+        if(out == OUT_BOOL):
+            return get_bool(mbyte, offset, bit)
+        elif(out == OUT_INT or out == OUT_WORD):
+            return get_int(mbyte, offset)
+        elif(out == OUT_REAL):
+            return get_real(mbyte, offset)
+        elif(out == OUT_DWORD):
+            return get_dword(mbyte, offset)
+
+#-----------------------------------------------------------------------------
+    def getMem(self, mem, returnByte=False):
+        """ Get the PLC state from related memeory address: IX0.N-input, QX0.N-output, 
+            MX0.N-memory
+        """
+        (area, start, length, out, bit) = compileMem(mem)
+        # Read data from the PLC (or the cache)
+        mbyte = self.cache.get((area, start, length))
+        if mbyte is not None:
+            mbyte = bytearray(mbyte)
+        else:
+            mbyte = self._readShadowed(area, 0, start, length)
+            if mbyte is None: return None
+            self.cache.put((area, start, length), bytearray(mbyte))
+        if(self.debug):
+            print("S7PLC1200 getMem() get data set[mem[0], start, length, bit, mbyte]:" % str(
+                mem[0].lower(), start, length, bit, str(mbyte)))
+        return mbyte if returnByte else self._decode(mbyte, 0, out, bit)
+
+#-----------------------------------------------------------------------------
+    def getMany(self, memList):
+        """ Get the PLC states of a list of memory addresses. The addresses of 
+            each area are merged to contiguous spans and every span is fetched
+            by one read. Return the list of decoded values in the 
+            order of memList (None if any read failed).
+        """
+        itemList = [compileMem(mem) for mem in memList]
+        # Merge the addresses of the same area to spans: [area, start, end]
+        spanList = []
+        for (area, start, length, _, _) in sorted(itemList, key=lambda x: (x[0], x[1])):
+            if spanList and spanList[-1][0] == area and start <= spanList[-1][2] + MERGE_GAP:
+                spanList[-1][2] = max(spanList[-1][2], start+length)
+            else:
+                spanList.append([area, start, start+length])
+        # Read the spans from the PLC.
+        dataList = []
+        for (area, start, end) in spanList:
+            mbyte = self._readShadowed(area, 0, start, end-start)
+            if mbyte is None: return None
+            dataList.append((area, start, end, mbyte))
+        # Decode the value of each address from its span.
+        result = []
+        for (area, start, length, out, bit) in itemList:
+            for (sArea, sStart, sEnd, mbyte) in dataList:
+                if sArea == area and sStart <= start and start+length <= sEnd:
+                    result.append(self._decode(mbyte, start-sStart, out, bit))
+                    break
+        return result
+
+#-----------------------------------------------------------------------------
+    def getBlock(self, memType, start, count, dataType='real', dbNum=0):
+        """ Read <count> values of <dataType> (key of BLOCK_DTYPE) from the byte
+            <start> of the area ('m', 'q', 'i' or 'db' with the data block 
+            number <dbNum>) in one read and decode them in one vectorized step.
+            Return the NumPy array in native byte order (None if failed).
+        """
+        if np is None:
+            print("S7PLC1200:   getBlock() needs the NumPy module.")
+            return None
+        dtype = np.dtype(BLOCK_DTYPE[dataType])
+        area = AREA_DB if memType.lower() == 'db' else MEM_AREA[memType.lower()]
+        mbyte = self._readShadowed(area, dbNum, start, count*dtype.itemsize)
+        if mbyte is None: return None
+        return np.frombuffer(bytes(mbyte), dtype=dtype).astype(dtype.newbyteorder('='))
+
+#-----------------------------------------------------------------------------
+    def readInputs(self, count=INPUT_BITS):
+        """ Read <count> I area bits from Ix0.0 with one read, return the bits as
+            an int (bit n - Ix(n//8).(n%8)), None if the read failed.
+        """
+        mbyte = self._readShadowed(MEM_AREA['i'], 0, 0, (count + 7)//8)
+        if mbyte is None: return None
+        return int.from_bytes(bytes(mbyte), 'little') & ((1 << count) - 1)
+
+#-----------------------------------------------------------------------------
+    def _holdWrites(self, memDict):
+        """ Queue/drop the writes if the PLC is down and return True, else send
+            the queued writes first and return False.
+        """
+        if self.breaker.blocked():
+            if self.queueWrites: self.queuedDict.update(memDict)
+            return True
+        for mem in memDict: self.queuedDict.pop(mem, None)  # overwritten by the new write.
+        self.sendQueued()
+        return False
+
+#-----------------------------------------------------------------------------
+    def sendQueued(self):
+        """ Send the writes queued while the PLC was down if the breaker lets
+            the calls through (call it periodically to replay them as soon as
+            the PLC recovered). Return True if no write is left queued.
+        """
+        if not self.queuedDict: return True
+        if self.breaker.blocked(): return False
+        queuedDict, self.queuedDict = self.queuedDict, {}
+        # the failed writes are queued again by writeMany().
+        return self.writeMany(queuedDict) or not self.queuedDict
+
+#-----------------------------------------------------------------------------
+    def writeMem(self, mem, value):
+        """ Set the PLC state from related memeory address: IX0.N-input, QX0.N-output, 
+            MX0.N-memory. Return None if the PLC is down (the write is queued 
+            or dropped).
+        """
+        if self._holdWrites({mem: value}): return None
+        (area, start, length, out, bit) = compileMem(mem)
+        # The read-modify-write is done under the client lock, so the reads/
+        # writes of other threads can not interleave with it.
+        with self.lock:
+            # Only a bit write keeps the other bits of the byte, the other types
+            # overwrite all their bytes.
+            data = self._currentBytes(area, start, length) if out == OUT_BOOL else bytearray(length)
+            if data is None:
+                if self.queueWrites: self.queuedDict[mem] = value
+                return None
+            # Set the data with the utility functions from <snap7.util>
+            if(out == OUT_BOOL):
+                set_bool(data, 0, bit, int(value))
+            elif(out == OUT_INT):
+                set_int(data, 0, value)
+            elif(out == OUT_DWORD):
+                set_dword(data, 0, value)
+            elif(out == OUT_REAL):
+                set_real(data, 0, value)
+            # Call the write function and return the value.
+            result = self._writeArea(area, 0, start, data)
+            if result is not None: 
+                self._cacheWrite(area, start, data)
+            elif self.queueWrites:
+                self.queuedDict[mem] = value
+            return result
+
+#-----------------------------------------------------------------------------
+    def writeMany(self, memDict):
+        """ Set the states of several addresses {mem: value}, the bits in the same
+            byte are set with one write_area. Return True if all the writes are
+            done.
+        """
+        if self._holdWrites(memDict): return False
+        result = True
+        byteDict = {}   # bits grouped by the byte: {(area, start): [(mem, bit, value)]}
+        for mem, value in memDict.items():
+            (area, start, _, out, bit) = compileMem(mem)
+            if out == OUT_BOOL:
+                byteDict.setdefault((area, start), []).append((mem, bit, value))
+            elif self.writeMem(mem, value) is None:
+                result = False
+        for (area, start), bitList in byteDict.items():
+            # read-modify-write of the byte under the client lock.
+            with self.lock:
+                data = self._currentBytes(area, start, 1)
+                if data is not None:
+                    for (_, bit, value) in bitList: set_bool(data, 0, bit, int(value))
+                if data is None or self._writeArea(area, 0, start, data) is None:
+                    result = False
+                    if self.queueWrites: 
+                        self.queuedDict.update({mem: value for (mem, _, value) in bitList})
+                else:
+                    self._cacheWrite(area, start, data)
+        return result
+
+#-----------------------------------------------------------------------------
+    def resync(self):
+        """ Force reading the shadow image of all the areas from the PLC, 
+            return True if the shadow is valid.
+        """
+        with self.lock:
+            for area in self.memAreaDict.values():
+                if self._readShadowed(area, 0, 0, SHADOW_SIZE) is None: return False
+            return True
+
+#-----------------------------------------------------------------------------
+    def _expireShadow(self):
+        """ Mark the shadow image stale, the next bit writes read their bytes."""
+        for area in self.shadowTime: self.shadowTime[area] = 0
+
+#-----------------------------------------------------------------------------
+    def _patchShadow(self, area, start, data):
+        """ Copy the data read from / written to the PLC in the shadow image."""
+        end = min(start+len(data), SHADOW_SIZE)
+        if start < end: self.shadowDict[area][start:end] = data[:end-start]
+
+#-----------------------------------------------------------------------------
+    def _cacheWrite(self, area, start, data):
+        """ Patch the shadow image and the cached bytes overlapped with the data
+            written to the PLC.
+        """
+        self._patchShadow(area, start, data)
+        def patch(key, mbyte):
+            (cArea, cStart, cLength) = key
+            if cArea == area:
+                for idx in range(max(start, cStart), min(start+len(data), cStart+cLength)):
+                    mbyte[idx-cStart] = data[idx-start]
+            return mbyte
+        self.cache.update(patch)
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class S7Executor(object):
+    """ Executor-backed S7-1200 client: the calls of the blocking snap7 client 
+        run on one dedicated worker thread of the PLC and return Futures (or 
+        awaitables with the async* methods), so the UI/request threads never 
+        block on the network. At most <maxQueue> calls can be pending, a 
+        pending call can be cancelled with Future.cancel().
+    """
+    def __init__(self, ip, maxQueue=MAX_QUEUE, **kwargs):
+        self.plc = S7PLC1200(ip, **kwargs)
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='S7-%s' % ip)
+        self.queueSlots = threading.BoundedSemaphore(maxQueue)
+        self.pendingSet = set()
+        self.lock = threading.Lock()
+
+#--S7Executor------------------------------------------------------------------
+    def submit(self, funcName, *args, block=True):
+        """ Queue the call of the S7PLC1200 method <funcName> to the worker,
+            return the Future (None if the queue is full and not block).
+        """
+        if not self.queueSlots.acquire(blocking=block): return None
+        try:
+            future = self.worker.submit(getattr(self.plc, funcName), *args)
+        except RuntimeError:
+            self.queueSlots.release()   # the worker is shut down by close().
+            raise
+        with self.lock:
+            self.pendingSet.add(future)
+        future.add_done_callback(self._callDone)
+        return future
+
+#--S7Executor------------------------------------------------------------------
+    def _callDone(self, future):
+        """ Free the queue slot when the call finished or was cancelled."""
+        with self.lock:
+            self.pendingSet.discard(future)
+        self.queueSlots.release()
+
+#--S7Executor------------------------------------------------------------------
+    def getMem(self, mem, returnByte=False):
+        return self.submit('getMem', mem, returnByte)
+
+    def getMany(self, memList):
+        return self.submit('getMany', memList)
+
+    def getBlock(self, memType, start, count, dataType='real', dbNum=0):
+        return self.submit('getBlock', memType, start, count, dataType, dbNum)
+
+    def writeMem(self, mem, value):
+        return self.submit('writeMem', mem, value)
+
+    def writeMany(self, memDict):
+        return self.submit('writeMany', memDict)
+
+#--S7Executor------------------------------------------------------------------
+    def asyncCall(self, funcName, *args):
+        """ Awaitable version of submit() for the asyncio users, it never blocks
+            the event loop: if the queue is full (or the executor is closed) the
+            returned future fails with RuntimeError.
+        """
+        try:
+            future = self.submit(funcName, *args, block=False)
+        except RuntimeError as err:
+            future, errMsg = None, str(err)
+        else:
+            errMsg = "S7Executor: PLC %s call queue is full." % self.plc.ip
+        if future is not None: return asyncio.wrap_future(future)
+        failed = asyncio.get_event_loop().create_future()
+        failed.set_exception(RuntimeError(errMsg))
+        return failed
+
+#--S7Executor------------------------------------------------------------------
+    def cancelAll(self):
+        """ Cancel all the calls not started yet, return the number cancelled."""
+        with self.lock:
+            pendingList = list(self.pendingSet)
+        return sum(1 for future in pendingList if future.cancel())
+
+#--S7Executor------------------------------------------------------------------
+    def close(self):
+        """ Cancel the pending calls, stop the worker and disconnect the PLC."""
+        self.cancelAll()
+        self.worker.shutdown(wait=True)
+        self.plc.plc.disconnect()
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class S7ExecutorPool(object):
+    """ Process-wide pool of the S7Executor keyed by the PLC IP address, so all
+        the users of one PLC share its client and dedicated worker.
+    """
+    def __init__(self):
+        self.executorDict = {}
+        self.lock = threading.Lock()
+
+#--S7ExecutorPool--------------------------------------------------------------
+    def getExecutor(self, ip, **kwargs):
+        """ Get the executor of the PLC, create it at the first call (the kwargs
+            are passed to the S7Executor/S7PLC1200).
+        """
+        with self.lock:
+            if ip not in self.executorDict:
+                self.executorDict[ip] = S7Executor(ip, **kwargs)
+            return self.executorDict[ip]
+
+#--S7ExecutorPool--------------------------------------------------------------
+    def closeAll(self):
+        with self.lock:
+            for executor in self.executorDict.values(): executor.close()
+            self.executorDict = {}
+
+# Pool shared by all the S7 users in the process.
+gS7Pool = S7ExecutorPool()
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class S7ScanEngine(plcScan.PlcScanner):
+    """ Cyclic scan engine of one S7-1200 PLC: read the whole byte range of the
+        areas once every <period> sec, XOR it with the previous image and 
+        publish only the changed bits to the subscribers as a list of 
+        (address, value), such as [('qx0.2', True), ('ix0.1', False)]. The 
+        first scan publishes all the bits.
+    """
+    def __init__(self, plc, period=SCAN_PERIOD, areaList=('i', 'q', 'm'), size=SHADOW_SIZE):
+        plcScan.PlcScanner.__init__(self, period)
+        self.plc = plc          # S7PLC1200 client.
+        self.areaList = areaList
+        self.size = size
+        self.imageDict = {}     # previous scan image {area char: int of the bytes}
+
+#--S7ScanEngine----------------------------------------------------------------
+    def scanOnce(self):
+        """ Read all the areas, return the changed bits list [(address, value)]."""
+        changeList = []
+        for memType in self.areaList:
+            area = MEM_AREA[memType]
+            mbyte = self.plc._readShadowed(area, 0, 0, self.size)
+            if mbyte is None: continue  # keep the previous image, retry next scan.
+            # bit n of byte k is the bit k*8+n of the little-endian int.
+            newImg = int.from_bytes(bytes(mbyte), 'little')
+            for idx in plcScan.changedBits(newImg, self.imageDict.get(memType), self.size*8):
+                changeList.append(('%sx%s.%s' % (memType, idx//8, idx % 8), 
+                                   bool(newImg >> idx & 1)))
+            self.imageDict[memType] = newImg
+        return changeList
+
+#-----------------------------------------------------------------------------
+def testCase():
+    plc = S7PLC1200('192.168.10.73')  # ,debug=True)
+    #turn on outputs cascading
+    for x in range(0, 7):
+        plc.writeMem('qx0.'+str(x), True)
+        sleep(.5)
+    sleep(1)
+    #turn off outputs
+    for x in range(0, 7):
+        plc.writeMem('qx0.'+str(x), False)
+        sleep(.5)
+    plc.plc.disconnect()
+
+	
+#-----------------------------------------------------------------------------
+if __name__ == '__main__':
+    testCase()
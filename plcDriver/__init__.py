@@ -0,0 +1,16 @@
+#-----------------------------------------------------------------------------
+# Name:        plcDriver
+#
+# Purpose:     PLC driver package shared by the railway hub <src>, the power 
+#              generator manager <pwrGen> and the attack tools <attack>. 
+#              plcInterface.py : vendor-neutral PLCDriver interface.
+#              M2PLC221.py     : Schneider M221 Modbus-TCP client.
+#              S7PLC1200.py    : Siemens S7-1200 snap7 client.
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+from .plcInterface import PLCDriver, PLCBatch, M221Driver, S7Driver, getDriver
@@ -0,0 +1,99 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        plcBreaker.py
+#
+# Purpose:     This module provide the per-PLC circuit breaker used by the PLC
+#              clients <M2PLC221.py> and <S7PLC1200.py>. After some continuous
+#              failures the breaker opens and the PLC calls fail fast without
+#              touching the network, the connection is retried with an
+#              exponential backoff time.
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import threading
+import time
+
+# Breaker state:
+BK_CLOSED = 0       # PLC working, all calls pass.
+BK_OPEN = 1         # PLC down, calls fail fast.
+BK_HALF_OPEN = 2    # backoff time passed, one trial call is allowed.
+
+FAIL_MAX = 2        # number of continuous failures to open the breaker.
+BACKOFF_MIN = 1     # first retry backoff time (sec).
+BACKOFF_MAX = 30    # max retry backoff time (sec).
+TRIAL_TIMEOUT = 1   # a trial call not reported in this time (sec) is given up.
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class CircuitBreaker(object):
+    """ Circuit breaker of one PLC connection."""
+    def __init__(self, name, failMax=FAIL_MAX, backoffMin=BACKOFF_MIN, backoffMax=BACKOFF_MAX,
+                 trialTimeout=TRIAL_TIMEOUT):
+        self.name = name
+        self.failMax = failMax
+        self.backoffMin = backoffMin
+        self.backoffMax = backoffMax
+        self.state = BK_CLOSED
+        self.failCount = 0
+        self.backoff = backoffMin
+        self.retryT = 0         # time to allow the next trial call (start of the trial).
+        self.trialTimeout = trialTimeout
+        self.lock = threading.Lock()
+
+#--CircuitBreaker--------------------------------------------------------------
+    def allow(self):
+        """ Return True if the PLC call is allowed to go to the network."""
+        with self.lock:
+            if self.state == BK_CLOSED: return True
+            if self._trialLost(): self.state = BK_OPEN
+            if self.state == BK_OPEN and time.time() >= self.retryT:
+                self.state = BK_HALF_OPEN   # let one call try the PLC.
+                self.retryT = time.time()
+                return True
+            return False
+
+#--CircuitBreaker--------------------------------------------------------------
+    def blocked(self):
+        """ Return True if the calls are currently rejected (no state change)."""
+        if self.state == BK_HALF_OPEN: return not self._trialLost()
+        return self.state == BK_OPEN and time.time() < self.retryT
+
+#--CircuitBreaker--------------------------------------------------------------
+    def _trialLost(self):
+        """ Return True if the trial call was never reported (such as a pipelined
+            request nobody collected), so a new trial can be allowed.
+        """
+        return self.state == BK_HALF_OPEN and time.time() >= self.retryT + self.trialTimeout
+
+#--CircuitBreaker--------------------------------------------------------------
+    def onSuccess(self):
+        """ Record a successful call, close the breaker."""
+        with self.lock:
+            if self.state != BK_CLOSED:
+                print("CircuitBreaker: %s recovered." % self.name)
+            self.state = BK_CLOSED
+            self.failCount = 0
+            self.backoff = self.backoffMin
+
+#--CircuitBreaker--------------------------------------------------------------
+    def onFailure(self):
+        """ Record a failed call, open the breaker if the trial call failed
+            or too many calls failed continuously.
+        """
+        with self.lock:
+            self.failCount += 1
+            if self.state == BK_HALF_OPEN or self.failCount >= self.failMax:
+                if self.state == BK_CLOSED:
+                    print("CircuitBreaker: %s down, retry in %s sec." % (self.name, self.backoff))
+                self.state = BK_OPEN
+                self.retryT = time.time() + self.backoff
+                self.backoff = min(self.backoff * 2, self.backoffMax)
+
+#--CircuitBreaker--------------------------------------------------------------
+    def isConnected(self):
+        """ Return 1 if the PLC is taken as connected else 0."""
+        return 0 if self.state == BK_OPEN else 1
@@ -0,0 +1,69 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        plcCache.py
+#
+# Purpose:     This module provide the read-through process image cache used by
+#              the PLC clients <M2PLC221.py> and <S7PLC1200.py>. A memory block
+#              read from the PLC is kept for <ttl> seconds so bursty polling is
+#              served from memory, our own successful writes patch the cached
+#              block and any communication error drops the whole image.
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import threading
+import time
+
+CACHE_TTL = 0       # default time to live (sec), 0 - cache disabled.
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class PlcImageCache(object):
+    """ Process image cache of one PLC: {blockKey: [value, timeStamp]}. The
+        block key is defined by the PLC client, such as (start, count) of the
+        M221 bits or (area, start, length) of the S7 bytes.
+    """
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self.imageDict = {}
+        self.lock = threading.Lock()
+
+#--PlcImageCache---------------------------------------------------------------
+    def get(self, key):
+        """ Return the cached block value, None if not cached or expired."""
+        if self.ttl <= 0: return None
+        with self.lock:
+            item = self.imageDict.get(key)
+            if item and time.time() - item[1] <= self.ttl:
+                return item[0]
+            return None
+
+#--PlcImageCache---------------------------------------------------------------
+    def put(self, key, value):
+        """ Cache the block value read from the PLC."""
+        if self.ttl <= 0: return
+        with self.lock:
+            self.imageDict[key] = [value, time.time()]
+
+#--PlcImageCache---------------------------------------------------------------
+    def update(self, func):
+        """ Patch the cached blocks after our own successful write: func(key,
+            value) returns the new value of the block (the time stamp is kept).
+        """
+        with self.lock:
+            for item in self.imageDict.items():
+                item[1][0] = func(item[0], item[1][0])
+
+#--PlcImageCache---------------------------------------------------------------
+    def invalidate(self, func=None):
+        """ Drop the blocks which func(key) returns True (all blocks if func is
+            None).
+        """
+        with self.lock:
+            if func is None:
+                self.imageDict = {}
+            else:
+                self.imageDict = {k: v for k, v in self.imageDict.items() if not func(k)}
@@ -0,0 +1,74 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        plcInputScan.py
+#
+# Purpose:     High rate input scanner of the PLC sensor inputs (M221 %I read by
+#              FC2, S7-1200 I area) for the hardware-in-the-loop mode: poll the
+#              input bits, XOR them with the previous scan and publish the edges
+#              with the time stamp of the read to the subscribers. The scan rate
+#              is bounded by a scan budget (the part of the time the scanner may
+#              keep the PLC link busy), so a slow PLC link is never saturated by
+#              the input polling.
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import time
+from . import plcScan
+
+INPUT_SCAN_PERIOD = 0.02    # min time between two input scans (sec).
+SCAN_BUDGET = 0.3           # max part of the time used by the input scan (0-1].
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class PlcInputScanner(plcScan.PlcScanner):
+    """ Input scanner of one PLC. readFunc() returns the input bits as an int
+        (bit n - input n) or None if the read failed, the changed bits are
+        published as [(address, value, timeStamp)] such as [('I0.3', True,
+        1585901234.56)], the address is addrFmt % n. The first scan publishes
+        all the bits. After a scan taking t sec the scanner waits at least
+        t*(1/budget - 1) sec, so the scans use at most <budget> of the time.
+    """
+    def __init__(self, readFunc, addrFmt, bitCount, period=INPUT_SCAN_PERIOD,
+                 budget=SCAN_BUDGET):
+        plcScan.PlcScanner.__init__(self, period)
+        self.readFunc = readFunc
+        self.addrFmt = addrFmt
+        self.bitCount = bitCount
+        self.budget = min(1.0, max(0.01, budget))
+        self.image = None       # input bits of the last successful scan.
+        self.counters = {'scans': 0, 'errors': 0, 'edges': 0, 'lastRtt': 0}
+
+#--PlcInputScanner-------------------------------------------------------------
+    def scanOnce(self):
+        """ Read the inputs, return the changed bits list [(address, value,
+            timeStamp)]. The time stamp is the middle of the request, which is
+            the best guess of when the PLC sampled the inputs.
+        """
+        startT = time.time()
+        try:
+            newImg = self.readFunc()
+        except Exception as err:
+            print("PlcInputScanner: read error: %s" % str(err))
+            newImg = None
+        endT = time.time()
+        self.counters['scans'] += 1
+        self.counters['lastRtt'] = endT - startT
+        if newImg is None:
+            self.counters['errors'] += 1
+            return []   # keep the previous image, retry next scan.
+        timeStamp = (startT + endT)/2
+        changeList = [(self.addrFmt % idx, bool(newImg >> idx & 1), timeStamp)
+                      for idx in plcScan.changedBits(newImg, self.image, self.bitCount)]
+        self.image = newImg
+        self.counters['edges'] += len(changeList)
+        return changeList
+
+#--PlcInputScanner-------------------------------------------------------------
+    def nextWait(self):
+        # keep the scans within the scan budget of the PLC link time.
+        rtt = self.counters['lastRtt']
+        return max(self.period - rtt, rtt*(1/self.budget - 1))
@@ -0,0 +1,187 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        plcInterface.py
+#
+# Purpose:     This module provide the vendor-neutral PLC driver interface 
+#              <PLCDriver> and its Schneider M221 <M2PLC221.py> and Siemens 
+#              S7-1200 <S7PLC1200.py> backends, so the callers read/write the 
+#              PLC bits the same way whatever the PLC type is.
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+from . import M2PLC221 as m221
+from . import plcInputScan
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class PLCBatch(object):
+    """ Write transaction of a PLC driver: the writes are collected and sent 
+        with one write_bits() call when the <with> block exits normally, the 
+        result is kept in <result>.
+        with driver.batch() as batch:
+            batch.write('M0', 1)
+            batch.write('M1', 0)
+    """
+    def __init__(self, driver, wait=True):
+        self.driver = driver
+        self.wait = wait
+        self.writeDict = {}
+        self.result = None
+
+#--PLCBatch--------------------------------------------------------------------
+    def write(self, addr, val):
+        """ Queue the bit write, the last value of the address wins."""
+        self.writeDict[addr] = val
+
+#--PLCBatch--------------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+#--PLCBatch--------------------------------------------------------------------
+    def __exit__(self, excType, excVal, excTb):
+        if excType is None and self.writeDict:
+            self.result = self.driver.write_bits(self.writeDict, wait=self.wait)
+        return False
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class PLCDriver(object):
+    """ Vendor-neutral PLC driver interface, <plc> is the backend client."""
+    def __init__(self, plc):
+        self.plc = plc
+
+#--PLCDriver-------------------------------------------------------------------
+    def read_bits(self, addrList):
+        """ Read the bit addresses, return the list of values in the order of 
+            addrList (None if the read failed).
+        """
+        raise NotImplementedError
+
+#--PLCDriver-------------------------------------------------------------------
+    def write_bits(self, bitDict, wait=True):
+        """ Write the bits {address: value}, return True if done. If not wait,
+            the writes may be pipelined and the result is not checked.
+        """
+        raise NotImplementedError
+
+#--PLCDriver-------------------------------------------------------------------
+    def batch(self, wait=True):
+        """ Return a PLCBatch write transaction of the driver."""
+        return PLCBatch(self, wait=wait)
+
+#--PLCDriver-------------------------------------------------------------------
+    def getScanEngine(self):
+        """ Return the cyclic scan engine of the PLC (None if not supported)."""
+        return None
+
+#--PLCDriver-------------------------------------------------------------------
+    def getInputScanner(self, period=plcInputScan.INPUT_SCAN_PERIOD,
+                        budget=plcInputScan.SCAN_BUDGET):
+        """ Return the sensor input scanner <plcInputScan.PlcInputScanner> of
+            the PLC (None if not supported).
+        """
+        return None
+
+#--PLCDriver-------------------------------------------------------------------
+    def isConnected(self):
+        """ Return the PLC connection state from the circuit breaker: 1/0."""
+        return self.plc.isConnected()
+
+#--PLCDriver-------------------------------------------------------------------
+    def flush(self):
+        """ Wait for the pipelined writes to finish."""
+        pass
+
+#--PLCDriver-------------------------------------------------------------------
+    def sendQueued(self):
+        """ Replay the writes queued while the PLC was down (if it recovered),
+            return True if no write is left queued.
+        """
+        return self.plc.sendQueued()
+
+#--PLCDriver-------------------------------------------------------------------
+    def close(self):
+        pass
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class M221Driver(PLCDriver):
+    """ Schneider M221 backend, the addresses are the %M tags such as 'M10'."""
+    def __init__(self, ip, **kwargs):
+        PLCDriver.__init__(self, m221.M221(ip, **kwargs))
+
+#--M221Driver------------------------------------------------------------------
+    def read_bits(self, addrList):
+        # read all the tags with one FC1 request covering them.
+        idxList = [m221.MEM_IDX[addr] for addr in addrList]
+        start = min(idxList)
+        image = self.plc.readBits(start, max(idxList) - start + 1)
+        return [image.getBit(idx) for idx in idxList] if image else None
+
+#--M221Driver------------------------------------------------------------------
+    def write_bits(self, bitDict, wait=True):
+        result = self.plc.writeMany(bitDict, wait=wait)
+        return result if wait else True
+
+#--M221Driver------------------------------------------------------------------
+    def getInputScanner(self, period=plcInputScan.INPUT_SCAN_PERIOD,
+                        budget=plcInputScan.SCAN_BUDGET):
+        # FC2 read of the %I0.0 - %I0.7 inputs.
+        def readFunc():
+            image = self.plc.readInputs(0, m221.INPUT_BITS)
+            return image.value if image else None
+        return plcInputScan.PlcInputScanner(readFunc, 'I0.%s', m221.INPUT_BITS,
+                                            period=period, budget=budget)
+
+#--M221Driver------------------------------------------------------------------
+    def flush(self):
+        self.plc.flush()
+
+#--M221Driver------------------------------------------------------------------
+    def close(self):
+        self.plc.disconnect()
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class S7Driver(PLCDriver):
+    """ Siemens S7-1200 backend, the addresses are the bit addresses such as 
+        'qx0.2'.
+    """
+    def __init__(self, ip, **kwargs):
+        # snap7 is only needed by the S7 backend.
+        from . import S7PLC1200 as s71200
+        self.s71200 = s71200
+        PLCDriver.__init__(self, s71200.S7PLC1200(ip, **kwargs))
+
+#--S7Driver--------------------------------------------------------------------
+    def read_bits(self, addrList):
+        return self.plc.getMany(addrList)
+
+#--S7Driver--------------------------------------------------------------------
+    def write_bits(self, bitDict, wait=True):
+        return self.plc.writeMany({addr: bool(val) for addr, val in bitDict.items()})
+
+#--S7Driver--------------------------------------------------------------------
+    def getScanEngine(self):
+        # the I area is scanned by the input scanner.
+        return self.s71200.S7ScanEngine(self.plc, areaList=('q', 'm'))
+
+#--S7Driver--------------------------------------------------------------------
+    def getInputScanner(self, period=plcInputScan.INPUT_SCAN_PERIOD,
+                        budget=plcInputScan.SCAN_BUDGET):
+        return plcInputScan.PlcInputScanner(
+            self.plc.readInputs, 'ix0.%s', self.s71200.INPUT_BITS, period=period, budget=budget)
+
+#--S7Driver--------------------------------------------------------------------
+    def close(self):
+        self.plc.plc.disconnect()
+
+#-----------------------------------------------------------------------------
+def getDriver(plcType, ip, **kwargs):
+    """ Create the PLC driver of the PLC type: 'M' - M221, 'C' - S7-1200."""
+    driverDict = {'M': M221Driver, 'C': S7Driver}
+    return driverDict[plcType](ip, **kwargs)
@@ -0,0 +1,80 @@
+#!/usr/bin/python
+#-----------------------------------------------------------------------------
+# Name:        plcScan.py
+#
+# Purpose:     This module provide the base of the cyclic PLC scanners (the S7
+#              output scan engine <S7PLC1200.S7ScanEngine> and the sensor input
+#              scanner <plcInputScan.PlcInputScanner>): the scan thread with the
+#              subscribers and the XOR bit image diff.
+#
+# Author:      agent
+#
+# Created:     2026/10/18
+# Copyright:   NUS Singtel Cyber Security Research & Development Laboratory
+# License:     YC @ NUS
+#-----------------------------------------------------------------------------
+import threading
+
+#-----------------------------------------------------------------------------
+def changedBits(newImg, oldImg, bitCount):
+    """ Return the indexes of the bits changed between the two bit images (int,
+        bit n - index n), all the <bitCount> bits if there is no old image.
+    """
+    mask = (1 << bitCount) - 1
+    diff = (newImg ^ oldImg if oldImg is not None else mask) & mask
+    idxList = []
+    while diff:
+        idxList.append((diff & -diff).bit_length() - 1)  # lowest set bit.
+        diff &= diff - 1
+    return idxList
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class PlcScanner(threading.Thread):
+    """ Base of the PLC scanners: the thread calls scanOnce() (implemented by
+        the subclass) every cycle, publishes the non-empty change list to the
+        subscribers and waits nextWait() sec (<period> by default).
+    """
+    def __init__(self, period):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.period = period
+        self.subscribers = []
+        self.wakeup = threading.Event()
+        self.terminate = False
+
+#--PlcScanner------------------------------------------------------------------
+    def subscribe(self, callback):
+        """ Register a callback(changeList) called from the scan thread."""
+        self.subscribers.append(callback)
+
+#--PlcScanner------------------------------------------------------------------
+    def unsubscribe(self, callback):
+        if callback in self.subscribers: self.subscribers.remove(callback)
+
+#--PlcScanner------------------------------------------------------------------
+    def scanOnce(self):
+        """ Scan the PLC one time, return the change list."""
+        raise NotImplementedError
+
+#--PlcScanner------------------------------------------------------------------
+    def nextWait(self):
+        """ Return the wait time (sec) before the next scan."""
+        return self.period
+
+#--PlcScanner------------------------------------------------------------------
+    def run(self):
+        while not self.terminate:
+            changeList = self.scanOnce()
+            if changeList:
+                for callback in list(self.subscribers):
+                    try:
+                        callback(changeList)
+                    except Exception as err:
+                        print("%s: subscriber error: %s" % (self.__class__.__name__, str(err)))
+            self.wakeup.wait(self.nextWait())
+
+#--PlcScanner------------------------------------------------------------------
+    def stop(self):
+        self.terminate = True
+        self.wakeup.set()
@@ -17,13 +17,16 @@ import serial
 import threading
 
 import udpCom
-import M2PLC221 as m221
-import S7PLC1200 as s71200
+# import the PLC driver package from the project root folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from plcDriver import M2PLC221 as m221
+from plcDriver import S7PLC1200 as s71200
 
 
 PERIOD = 1  # update frequency
 UDP_PORT = 5005
 TEST_MODE = True
+PLC_CACHE_TTL = 0.5 # the PLC memory read within 0.5 sec is served from the cache.
 
 
 class pwrGenClient(object):
@@ -32,9 +35,16 @@ class pwrGenClient(object):
         self.loadNum = 0 
         # connect to the PLC
         if not TEST_MODE:
-            self.se1 = m221.M221('192.168.10.72')
-            self.se2 = s71200.S7PLC1200('192.168.10.73')
-            self.se3 = m221.M221('192.168.10.71')
+            self.se1 = m221.M221('192.168.10.72', cacheTTL=PLC_CACHE_TTL)
+            # S7 calls run on the PLC's executor worker, off the UDP thread.
+            self.se2Exec = s71200.gS7Pool.getExecutor('192.168.10.73', cacheTTL=PLC_CACHE_TTL)
+            self.se2 = self.se2Exec.plc
+            self.se3 = m221.M221('192.168.10.71', cacheTTL=PLC_CACHE_TTL)
+            # S7 output states {address: value} published by the scan engine.
+            self.se2States = {}
+            self.se2Scan = s71200.S7ScanEngine(self.se2, areaList=('q',))
+            self.se2Scan.subscribe(lambda changeList: self.se2States.update(changeList))
+            self.se2Scan.start()
 
         # Init the UDP server.
         self.server = udpCom.udpServer(None, UDP_PORT)
@@ -68,57 +78,54 @@ class pwrGenClient(object):
 
     def setPumpSpeed(self, spdNum):
         if TEST_MODE: return
+        # M4 and M5 are adjacent, set them in one FC15 frame.
         if spdNum == 0:
-            self.se1.writeMem('M4', 0)
-            self.se1.writeMem('M5', 0)
+            self.se1.writeMany({'M4': 0, 'M5': 0})
         elif spdNum == 1:
-            self.se1.writeMem('M4', 0)
-            self.se1.writeMem('M5', 1)
+            self.se1.writeMany({'M4': 0, 'M5': 1})
         elif spdNum == 2:
-            self.se1.writeMem('M4', 1)
-            self.se1.writeMem('M5', 0)
+            self.se1.writeMany({'M4': 1, 'M5': 0})
 
     def setMotoSpeed(self, spdNum):
         if TEST_MODE: return
+        # Q0.3 and Q0.4 are in the same byte, set them with one byte write so
+        # both are never on at the same time.
         if spdNum == 0:
-            self.se2.writeMem('qx0.3', False)
-            self.se2.writeMem('qx0.4', False)
+            future = self.se2Exec.writeMany({'qx0.3': False, 'qx0.4': False})
         elif spdNum == 1:
-            self.se2.writeMem('qx0.3', False)
-            self.se2.writeMem('qx0.4', True)
+            future = self.se2Exec.writeMany({'qx0.3': False, 'qx0.4': True})
         elif spdNum == 2:
-            self.se2.writeMem('qx0.3', True)
-            self.se2.writeMem('qx0.4', False)
+            future = self.se2Exec.writeMany({'qx0.3': True, 'qx0.4': False})
+        else:
+            return
+        future.add_done_callback(self._motoSpeedDone)
+
+    def _motoSpeedDone(self, future):
+        """ Log the failed motor speed write (called in the S7 executor worker)."""
+        if future.cancelled(): return
+        if future.exception():
+            print("Set motor speed: S7 write error: %s" % str(future.exception()))
+        elif not future.result():
+            print("Set motor speed: S7 write failed, queued until the PLC recovered.")
 
 
     def getLoadNum(self):
         if TEST_MODE: return 0
         count = 0
-        # Residential
-        if self.se2.getMem('qx0.2', True):
-            count += 1
-        # Station light
-        if self.se2.getMem('qx0.0', True):
-            count += 1
-
-        S1resp = self.se1.redMem()
-        #Industrial
-        if S1resp[19] != '0':
-            count += 1
-        # Run way
-        if S1resp[21] != '0':
-            count += 1
-
-        S3resp = self.se3.redMem()
-        # City
-        if S3resp[18] != '0':
-            count += 1
-        # Track A
-        if S3resp[19] != '0':
-            count += 1
-        # Track B
-        if S3resp[21] != '0':
-            count += 1
+        # Residential (Q0.2) and Station light (Q0.0) from the scan engine.
+        for mem in ('qx0.2', 'qx0.0'):
+            if self.se2States.get(mem): count += 1
+
+        # Each load is one nibble of the %M bit image: (bit address, bit count)
+        S1image = self.se1.readBits()
+        if S1image:
+            for addr in (0, 8):     # Industrial (M0-M3), Run way (M8-M11)
+                if S1image.anyBits(addr, 4): count += 1
+
+        S3image = self.se3.readBits()
+        if S3image:
+            for addr in (4, 0, 8):  # City (M4-M7), Track A (M0-M3), Track B (M8-M11)
+                if S3image.anyBits(addr, 4): count += 1
 
         return count
 
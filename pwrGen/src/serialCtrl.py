@@ -15,8 +15,10 @@ import time
 import serial
 import glob
 import wx
-import M2PLC221 as m221
-import S7PLC1200 as s71200
+# import the PLC driver package from the project root folder.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from plcDriver import M2PLC221 as m221
+from plcDriver import S7PLC1200 as s71200
 
 PERIODIC = 500      # update in every 500ms
 
@@ -179,14 +181,11 @@ class UIFrame(wx.Frame):
             self.serComm.write(msgStr.encode('utf-8'))
         time.sleep(0.1)
         if self.pumpSP.GetSelection() == 0:
-            self.se1.writeMem('M4', 0)
-            self.se1.writeMem('M5', 0)
+            self.se1.writeMany({'M4': 0, 'M5': 0})
         elif self.pumpSP.GetSelection() == 1:
-            self.se1.writeMem('M4', 0)
-            self.se1.writeMem('M5', 1)
+            self.se1.writeMany({'M4': 0, 'M5': 1})
         elif self.pumpSP.GetSelection() == 2:
-            self.se1.writeMem('M4', 1)
-            self.se1.writeMem('M5', 0)
+            self.se1.writeMany({'M4': 1, 'M5': 0})
         time.sleep(0.1)
         if self.MotoSP.GetSelection() == 0:
             self.se2.writeMem('qx0.3', False)
@@ -199,11 +198,9 @@ class UIFrame(wx.Frame):
             self.se2.writeMem('qx0.4', False)
         time.sleep(0.1)
         if self.senPower.GetSelection() == 0:
-            self.se3.writeMem('M4', 1)
-            self.se3.writeMem('M5', 1)
+            self.se3.writeMany({'M4': 1, 'M5': 1})
         elif self.senPower.GetSelection() == 1:
-            self.se3.writeMem('M4', 0)
-            self.se3.writeMem('M5', 0)
+            self.se3.writeMany({'M4': 0, 'M5': 0})
         time.sleep(0.1)
         if self.AllPower.GetSelection() == 0:
             self.se3.writeMem('M6', 0)
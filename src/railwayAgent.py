@@ -9,12 +9,16 @@
 # Copyright:   YC @ Singtel Cyber Security Research & Development Laboratory
 # License:     YC
 #-----------------------------------------------------------------------------
+import os
+import sys
 import math
+import threading
+import time
 import railwayGlobal as gv 
-# import the PLC control module.
+# import the PLC driver package from the project root folder.
 if not gv.iPlcSimulation:
-    import M2PLC221 as m221
-    import S7PLC1200 as s71200 
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    import plcDriver
 
 #-----------------------------------------------------------------------------
 #-----------------------------------------------------------------------------
@@ -28,20 +32,20 @@ class AgentPLC(object):
         self.plcName = name
         self.ipAddr = ipAddr
         self.plcType = plcType
-        self.plcConnector = None    # the connector to connect to plc
         self.devCount = 0           # input device count hook to the PLC.
         self.ctrlCount = 0          # ouput device count hook to the PLC.
         self.devIDList = [-1]*8     # input device ID list.
         self.ctrlIDList = [-1]*8    # output device ID list.
         self.ctrlIMQList = ['']*8   # output plc IMQ list
         self.inputStates = [0]*8    # PLC input plug states list.
+        self.inputTimes = [0]*8     # time stamp of the last input state change.
         self.outputStates = [0]*8   # PLC ouput plug states list.
-        # init the real plc connector if under real mode:
+        self.ioWorker = None        # PLC I/O worker thread connecting to the real plc.
+        # init the real plc I/O worker if under real mode:
         if not gv.iPlcSimulation:
-            if self.plcType == 'M':
-                self.plcConnector = m221.M221(self.ipAddr)
-            elif self.plcType == 'C':
-                self.plcConnector = s71200.S7PLC1200(self.ipAddr)
+            self.ioWorker = PlcIOWorker(
+                self.plcName, lambda: plcDriver.getDriver(self.plcType, self.ipAddr), 
+                gv.iPlcFlushInterval)
 
 #--AgentPLC--------------------------------------------------------------------
     def checkCtrl(self, idx):
@@ -86,6 +90,14 @@ class AgentPLC(object):
         """ Init the connection to the PLC from Mode bus. """
         pass
 
+#--AgentPLC--------------------------------------------------------------------
+    def getConnState(self):
+        """ Get the PLC connection state from the connector's circuit breaker: 
+            1 - connected, 0 - disconnected (always connected under simulation).
+        """
+        if gv.iPlcSimulation: return 1
+        return self.ioWorker.isConnected() if self.ioWorker else 0
+
 #--AgentPLC--------------------------------------------------------------------
     def getDevIds(self, sIdx, eIdx):
         """ Get the PLC device state from startIdx(sIdx) to endIdx(eIdx)."""
@@ -102,11 +114,12 @@ class AgentPLC(object):
         return self.outputStates[sIdx:eIdx]
 
 #--AgentPLC--------------------------------------------------------------------
-    def setInput(self, sensorID, state):
-        """ Update the sensor input state."""
+    def setInput(self, sensorID, state, timeStamp=None):
+        """ Update the sensor input state (timeStamp: time the PLC read the input)."""
         try:
             idx = self.devIDList.index(sensorID)
             self.inputStates[idx] = state
+            self.inputTimes[idx] = timeStamp or time.time()
         except:
             print("AgentPLC:    The sensor with %s is not hooked to this PLC" %str(sensorID))
 
@@ -118,15 +131,122 @@ class AgentPLC(object):
             self.outputStates[idx] = state
             imqVal = self.ctrlIMQList[idx]
             print("PLC setup cmd: %s" % str((self.plcName, imqVal, state)))
-            if not gv.iPlcSimulation:
-                if self.plcType == 'M' and self.plcConnector:
-                    self.plcConnector.writeMem(imqVal, state)
-                elif self.plcType == 'C' and self.plcConnector:
-                    stateVal = True if state else False
-                    self.plcConnector.writeMem(imqVal, stateVal)
+            # the I/O worker thread sends the output to the PLC.
+            if self.ioWorker: self.ioWorker.put(imqVal, state)
         except:
             print("AgentPLC:    The sensor with %s is not hooked to this PLC" %str(sensorID))
 
+#--AgentPLC--------------------------------------------------------------------
+    def startIO(self, onWriteDone=None, onScanChange=None, onInputChange=None):
+        """ Start the PLC I/O worker with the result handlers (see PlcIOWorker)."""
+        if not self.ioWorker: return
+        self.ioWorker.onWriteDone = onWriteDone
+        self.ioWorker.onScanChange = onScanChange
+        self.ioWorker.onInputChange = onInputChange
+        self.ioWorker.start()
+
+#--AgentPLC--------------------------------------------------------------------
+    def stop(self):
+        """ Flush the pending outputs and stop the PLC I/O worker thread."""
+        if self.ioWorker: self.ioWorker.stop()
+
+#-----------------------------------------------------------------------------
+#-----------------------------------------------------------------------------
+class PlcIOWorker(threading.Thread):
+    """ PLC I/O worker thread of one PLC: it creates (connects) the PLC driver 
+        by <connectFunc>, takes the output writes from the UI thread through 
+        the write queue (the pending writes to the same tag are collapsed to 
+        the latest value) and flushes them to the PLC every <interval> sec. 
+        The results are posted back through the handlers called in the worker
+        thread: onWriteDone(writeDict, result), onScanChange(changeList) of
+        the PLC scan engine and onInputChange(changeList) of the input scanner
+        (the sensor input edges [(address, value, timeStamp)]), so the UI 
+        thread never blocks on the sockets.
+    """
+    def __init__(self, plcName, connectFunc, interval):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.plcName = plcName
+        self.connectFunc = connectFunc
+        self.interval = interval
+        self.plcConnector = None    # the PLC driver <plcDriver.PLCDriver>.
+        self.scanEngine = None      # cyclic scan engine publishing the changed bits.
+        self.inScanner = None       # input scanner publishing the sensor input edges.
+        self.onWriteDone = None
+        self.onScanChange = None
+        self.onInputChange = None
+        self.pendingDict = {}   # {imqTag: latest state}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.terminate = False
+
+#--PlcIOWorker-----------------------------------------------------------------
+    def isConnected(self):
+        """ Return the PLC connection state: 1/0 (0 before the driver created)."""
+        return self.plcConnector.isConnected() if self.plcConnector else 0
+
+#--PlcIOWorker-----------------------------------------------------------------
+    def put(self, imqVal, state):
+        """ Queue the output write, replace the pending value of the same tag."""
+        with self.lock:
+            self.pendingDict[imqVal] = state
+
+#--PlcIOWorker-----------------------------------------------------------------
+    def flush(self):
+        """ Send all the pending writes to the PLC and report the result."""
+        with self.lock:
+            (writeDict, self.pendingDict) = (self.pendingDict, {})
+        if not self.plcConnector: return
+        if not writeDict:
+            # replay the writes queued by the driver while the PLC was down.
+            self.plcConnector.sendQueued()
+            return
+        result = False
+        try:
+            # all the outputs in one batch.
+            with self.plcConnector.batch() as batch:
+                for imqVal, state in writeDict.items(): batch.write(imqVal, state)
+            result = batch.result
+        except Exception as err:
+            print("PlcIOWorker: %s write error: %s" % (self.plcName, str(err)))
+        if self.onWriteDone: self.onWriteDone(writeDict, result)
+
+#--PlcIOWorker-----------------------------------------------------------------
+    def run(self):
+        # connect the PLC in the worker thread, not the UI thread.
+        try:
+            self.plcConnector = self.connectFunc()
+        except Exception as err:
+            print("PlcIOWorker: %s connection error: %s" % (self.plcName, str(err)))
+            return
+        self.scanEngine = self.plcConnector.getScanEngine()
+        if self.scanEngine:
+            if self.onScanChange: self.scanEngine.subscribe(self.onScanChange)
+            self.scanEngine.start()
+        if gv.iPlcInScan and self.onInputChange:
+            self.inScanner = self.plcConnector.getInputScanner(
+                period=gv.iPlcInScanPeriod, budget=gv.iPlcInScanBudget)
+            if self.inScanner:
+                self.inScanner.subscribe(self.onInputChange)
+                self.inScanner.start()
+        while not self.terminate:
+            self.wakeup.wait(self.interval)
+            self.flush()
+
+#--PlcIOWorker-----------------------------------------------------------------
+    def stop(self):
+        """ Stop the thread after the last flush, then the scanners, and close
+            the PLC driver.
+        """
+        self.terminate = True
+        self.wakeup.set()
+        self.join(self.interval*10)
+        for scanner in (self.scanEngine, self.inScanner):
+            if scanner:
+                scanner.stop()
+                scanner.join(self.interval*10)
+        if self.plcConnector: self.plcConnector.close()
+
 #-----------------------------------------------------------------------------
 #-----------------------------------------------------------------------------
 class AgentTarget(object):
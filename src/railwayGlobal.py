@@ -123,6 +123,10 @@ iMainFrame = None   # Main frame
 iMapMgr = None      # map manager
 iMapPanel = None    # History chart panel.
 iPlcSimulation = True   # Flag to identify whether connect to real PLC
+iPlcFlushInterval = 0.1 # PLC output write queue flush interval (sec).
+iPlcInScan = False      # Flag to drive the sensor inputs from the real PLC %I (real mode only).
+iPlcInScanPeriod = 0.02 # PLC input scan min period (sec).
+iPlcInScanBudget = 0.3  # max part of the PLC link time used by the input scan.
 iPlcPanelList = []  # Plc panel list. 
 iPlcMgr = None      # Plc manager 
 iPowCtrlPanel = None  # Power control panel.   
@@ -185,7 +185,7 @@ class railWayHubFrame(wx.Frame):
         (name, ip, plcType, _, _) = gv.PLC_CFG['PLC'+str(idx)]
         plcAgent = agent.AgentPLC(self, idx, name, ip, plcType)
         plcPanel = rwp.PanelPLC(plcBgPanel, 'PLC'+str(idx)+name, ip+':'+'502')
-        plcPanel.setConnection(1)
+        plcPanel.setConnection(plcAgent.getConnState())
         gv.iAgentMgr.appendPLC(plcAgent, plcPanel)
         return plcPanel
 
@@ -200,9 +200,11 @@ class railWayHubFrame(wx.Frame):
         timeStr = time.time()
         self.mapPanel.periodic(timeStr)
         self.attackPanel.periodic(timeStr)
+        gv.iAgentMgr.updateConnState()
 
 #--railWayHubFrame-------------------------------------------------------------
     def OnClose(self, event):
+        gv.iAgentMgr.stop()
         self.Destroy()
 
 #-----------------------------------------------------------------------------
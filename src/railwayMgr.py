@@ -25,6 +25,9 @@ class MapMgr(object):
         """ 
         self.signalDict = {}    # name follow the <PanelSysCtrl.powerLabel>
         self.gateAct = False    # flag to identify whether the gate is moving.
+        # hardware-in-the-loop: the sensors wired to the real PLC inputs are 
+        # driven by the PLC input scanner instead of the train positions.
+        self.hwSensors = gv.iPlcInScan and not gv.iPlcSimulation
         
         # Add the inside railway to the train (A).
         self.trackA = [(300, 50), (140, 50),
@@ -151,7 +154,7 @@ class MapMgr(object):
                 if sensorIDfb[i] < 0:
                     for trainPt in trainPts[i]:
                         if sensor.checkNear(trainPt[0], trainPt[1], 1):
-                            sensor.setSensorState(1)
+                            self.setSimSensor(sensor.sensorID, 1)
                             sensorIDfb[i] = sensor.sensorID
                             break
         return sensorIDfb  # return [-1, -1] if there is no sensor detected.
@@ -247,7 +250,7 @@ class MapMgr(object):
         if self.rwAsensorId != crtAsensorId:
             # Clear the old sensor state if the train has passed it.
             if self.rwAsensorId >= 0 and crtAsensorId < 0:
-                self.sensorList[self.rwAsensorId].setSensorState(0)
+                self.setSimSensor(self.rwAsensorId, 0)
             self.rwAsensorId = crtAsensorId
             # Get the curret position(railway) the train stay on.
             if self.trainA.getID() == 0:
@@ -291,7 +294,7 @@ class MapMgr(object):
         """
         if self.rwBsensorId != crtBsensorId:
             if self.rwBsensorId >= 0 and crtBsensorId < 0:
-                self.sensorList[self.rwBsensorId].setSensorState(0)
+                self.setSimSensor(self.rwBsensorId, 0)
             self.rwBsensorId = crtBsensorId
             if self.trainB.getID() == 0:
                 if self.rwBsensorId == 10:
@@ -362,10 +365,28 @@ class MapMgr(object):
             elif crtBsensorId >= 0 and self.rwBsensorId < 0:
                 idList.append(crtBsensorId)
                 stateList.append(1)
+        # The inputs of the hardware sensors are fed by the PLC input scanner.
+        if self.hwSensors:
+            simList = [(i, s) for (i, s) in zip(idList, stateList) if not self.isHwSensor(i)]
+            idList, stateList = [i for (i, _) in simList], [s for (_, s) in simList]
         # Update the PLC panel if any thing changed.
         if gv.iAgentMgr and len(idList) > 0:
             gv.iAgentMgr.updatePlcIn(idList, stateList)
 
+#--MapMgr----------------------------------------------------------------------
+    def isHwSensor(self, sensorId):
+        """ Return True if the sensor is driven by the real PLC input (HIL mode)."""
+        return self.hwSensors and gv.iAgentMgr is not None and \
+            gv.iAgentMgr.findInDevPLC(sensorId)[0] is not None
+
+#--MapMgr----------------------------------------------------------------------
+    def setSimSensor(self, sensorId, state):
+        """ Set the sensor state from the simulated train position, the sensors
+            driven by the real PLC inputs are only set by the input scanner.
+        """
+        if not self.isHwSensor(sensorId):
+            self.sensorList[sensorId].setSensorState(state)
+
 #--MapMgr----------------------------------------------------------------------
     def updateTPnlDisplay(self, trainID ,sensorId):
         """ Update the train panel display. """
@@ -398,6 +419,14 @@ class managerPLC(object):
     def appendPLC(self, plcAgent, plcPanel):
         self.plcAgentList.append(plcAgent)
         self.plcPanelList.append(plcPanel)
+        # the PLC I/O worker thread posts the results back to the UI thread.
+        plcAgent.startIO(
+            onWriteDone=lambda writeDict, result: wx.CallAfter(
+                self.updateWriteDone, plcAgent, plcPanel, writeDict, result),
+            onScanChange=lambda changeList: wx.CallAfter(
+                self.updateScanOut, plcAgent, plcPanel, changeList),
+            onInputChange=lambda changeList: wx.CallAfter(
+                self.updateScanIn, plcAgent, changeList))
 
 #--managerPLC------------------------------------------------------------------
     def findInDevPLC(self, devIdx):
@@ -433,14 +462,69 @@ class managerPLC(object):
             self.plcAgentList[plcIdx].hookSensor(sensorId, plcPos)
 
 #--managerPLC------------------------------------------------------------------
-    def updatePlcIn(self, devIDList, stateList):
-        """ update the Plc's input. """
+    def stop(self):
+        """ Stop all the PLC agents' write queues and close the PLC connections."""
+        for plcAgt in self.plcAgentList: plcAgt.stop()
+        # the released M221 sockets are kept open by the pool for reuse.
+        if not gv.iPlcSimulation: agent.plcDriver.M2PLC221.gConnPool.closeAll()
+
+#--managerPLC------------------------------------------------------------------
+    def updateConnState(self):
+        """ Update the PLC panels' connection state from the PLC agents."""
+        for plcAgt, plcPnl in zip(self.plcAgentList, self.plcPanelList):
+            plcPnl.setConnection(plcAgt.getConnState())
+
+#--managerPLC------------------------------------------------------------------
+    def updatePlcIn(self, devIDList, stateList, timeList=None):
+        """ update the Plc's input. timeList: time stamps of the input changes 
+            read from the real PLC (None for the simulated sensors).
+        """
         for i in range(len(devIDList)):
             devId, devS = devIDList[i], stateList[i]
+            timeStamp = timeList[i] if timeList else None
             (plcAgt, plcPnl, devP) = self.findInDevPLC(devIDList[i])
-            if plcAgt: plcAgt.setInput(devId, devS)     # update the agent's input.
+            if plcAgt: plcAgt.setInput(devId, devS, timeStamp)  # update the agent's input.
             if plcPnl: plcPnl.updateInput(devP, devS)   # update the pnale's input
 
+#--managerPLC------------------------------------------------------------------
+    def updateScanIn(self, plcAgent, changeList):
+        """ Feed the sensor input edges [(address, value, timeStamp)] read from
+            the real PLC by the input scanner to the PLC inputs and the map 
+            sensors, so the HMI mirrors the physical railway sensors.
+        """
+        devIDList, stateList, timeList = [], [], []
+        for (mem, state, timeStamp) in changeList:
+            # the sensors are wired to the input byte 0: 'I0.n' (M221), 'ix0.n' (S7).
+            devId = plcAgent.devIDList[int(mem.split('.')[-1])]
+            if devId < 0: continue
+            devIDList.append(devId)
+            stateList.append(1 if state else 0)
+            timeList.append(timeStamp)
+        if not devIDList: return
+        self.updatePlcIn(devIDList, stateList, timeList)
+        if gv.iMapMgr:
+            for devId, state in zip(devIDList, stateList):
+                gv.iMapMgr.sensorList[devId].setSensorState(state)
+
+#--managerPLC------------------------------------------------------------------
+    def updateWriteDone(self, plcAgent, plcPanel, writeDict, result):
+        """ Show the PLC connection state after the outputs written to the PLC."""
+        plcPanel.setConnection(plcAgent.getConnState())
+        if not result:
+            print("managerPLC:  %s output write %s failed." % (plcAgent.plcName, str(writeDict)))
+
+#--managerPLC------------------------------------------------------------------
+    def updateScanOut(self, plcAgent, plcPanel, changeList):
+        """ Update the Plc's output with the changed output bits published by 
+            the PLC scan engine, so the panel shows the real PLC state.
+        """
+        imqList = [imqVal.lower() for imqVal in plcAgent.ctrlIMQList]
+        for (mem, state) in changeList:
+            if mem in imqList:
+                devP, state = imqList.index(mem), 1 if state else 0
+                plcAgent.outputStates[devP] = state
+                plcPanel.updateOutput(devP, state)
+
 #--managerPLC------------------------------------------------------------------
     def updatePLCout(self, devID, state):
         """ update the Plc's output. """
@@ -238,6 +238,7 @@ class PanelPLC(wx.Panel):
         self.plcName = name
         self.ipAddr = ipAddr
         self.connected = {'0': 'Unconnected', '1': 'Connected'}
+        self.connState = None   # current connection state shown on the UI.
         self.gpioInList = [0]*8 # PLC GPIO input stuation list.
         self.gpioInLbList = []  # GPIO input device <id> label list.
         self.gpioOuList = [0]*8 # PLC GPIO output situation list.
@@ -317,6 +318,8 @@ class PanelPLC(wx.Panel):
     def setConnection(self, state):
         """ Update the connection state on the UI. 0 - disconnect 1- connected
         """
+        if state == self.connState: return
+        self.connState = state
         self.connLb.SetLabel(self.connected[str(state)])
         self.connLb.SetBackgroundColour(
             wx.Colour('GREEN') if state else wx.Colour(120, 120, 120))